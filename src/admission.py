@@ -0,0 +1,308 @@
+"""Admission control for the report pipeline.
+
+Two layers protect the model and the geocoder from any one client:
+
+- per-client token buckets (by API key when the key is known, else by IP),
+  answered with 429 and Retry-After once a client's burst is spent. Batch
+  reports draw one token each from a separate, larger batch bucket. Buckets
+  live in memory, or in a SQLite file (RATE_LIMIT_DB_PATH) so that every
+  worker process on the host shares them - no Redis needed.
+- a global limit on concurrent pipeline executions. Requests queue for a
+  free slot, but once the expected wait exceeds PIPELINE_QUEUE_BUDGET_MS they
+  are shed straight away with 503 and Retry-After instead of piling up.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from telemetry import admission_rejections, pipeline_in_flight
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+# Sustained requests per minute per client, and how many may arrive at once
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+# /api/process/batch: reports per minute per client, and how many one batch may carry at once
+BATCH_RATE_LIMIT_PER_MINUTE = float(os.getenv("BATCH_RATE_LIMIT_PER_MINUTE", str(RATE_LIMIT_PER_MINUTE * 10)))
+BATCH_RATE_LIMIT_BURST = float(os.getenv("BATCH_RATE_LIMIT_BURST", "1000"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Empty = in-memory buckets (per process)
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "")
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+# Comma-separated API keys that get their own bucket; other keys are limited by IP
+API_KEYS = {key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()}
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "8"))
+PIPELINE_QUEUE_BUDGET_MS = float(os.getenv("PIPELINE_QUEUE_BUDGET_MS", "2000"))
+
+class AdmissionRejected(Exception):
+    """A request was turned away; `retry_after` is in whole seconds"""
+    status = 503
+    reason = "rejected"
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class RateLimited(AdmissionRejected):
+    status = 429
+    reason = "rate_limited"
+
+class Overloaded(AdmissionRejected):
+    status = 503
+    reason = "overloaded"
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+class MemoryBucketStore:
+    """Token buckets in a bounded LRU dict (a dropped bucket simply starts full again)"""
+
+    def __init__(self, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max(1, max_clients)
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst):
+        """Spend `cost` tokens; returns (allowed, seconds until they would be available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+class SQLiteBucketStore:
+    """Token buckets shared by every process using the same SQLite file"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, table="rate_limit_buckets"):
+        self.path = path
+        self.table = table
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._takes = 0
+
+    def take(self, key, cost, rate, burst):
+        # Wall clock, since monotonic clocks are not comparable across processes
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so the
+            # read-modify-write below is atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT tokens, updated FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = _refill(*row, now, rate, burst) if row else burst
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    # Buckets idle long enough to be full again carry no state
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE updated < ?", (now - burst / rate,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+class RateLimiter:
+    """Per-client token bucket: `burst` requests at once, refilled at `per_minute`"""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, store=None):
+        self.rate = per_minute / 60.0
+        self.burst = max(1.0, burst)
+        self.store = store if store is not None else MemoryBucketStore()
+        self.counters = {"allowed": 0, "limited": 0, "store_errors": 0}
+
+    @property
+    def blocking(self):
+        """Whether check() does blocking I/O (a shared SQLite store)"""
+        return not isinstance(self.store, MemoryBucketStore)
+
+    def check(self, key, cost=1.0):
+        """Raise RateLimited if `key` is over its limit"""
+        if self.rate <= 0:
+            return
+        try:
+            allowed, wait = self.store.take(key, cost, self.rate, self.burst)
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter must not take the API down with it
+            print(f"⚠️ Rate limit store error: {e}")
+            self.counters["store_errors"] += 1
+            return
+        if allowed:
+            self.counters["allowed"] += 1
+            return
+        self.counters["limited"] += 1
+        admission_rejections.inc(reason=RateLimited.reason)
+        raise RateLimited("Rate limit exceeded", wait)
+
+    def metrics(self):
+        return dict(self.counters, clients=len(self.store), per_minute=self.rate * 60, burst=self.burst,
+                    store=type(self.store).__name__)
+
+class ConcurrencyGate:
+    """At most `limit` pipeline runs at once, with latency-budgeted queueing.
+
+    The expected wait for a newcomer is estimated from the queue length and a
+    moving average of how long a run takes. Requests that would wait longer
+    than `budget` seconds (or that do wait that long) are shed with Overloaded.
+    """
+
+    def __init__(self, limit=PIPELINE_MAX_CONCURRENCY, budget=PIPELINE_QUEUE_BUDGET_MS / 1000.0):
+        self.limit = max(1, limit)
+        self.budget = budget
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._avg_service = 0.0  # seconds, exponentially weighted
+        self.counters = {"admitted": 0, "queued": 0, "shed": 0, "timed_out": 0}
+
+    def expected_wait(self, queued=None):
+        """Seconds a request joining the queue now should expect to wait"""
+        queued = self._waiting if queued is None else queued
+        return (queued // self.limit + 1) * self._avg_service
+
+    def _shed(self, counter, wait):
+        self.counters[counter] += 1
+        admission_rejections.inc(reason=Overloaded.reason)
+        raise Overloaded("Server is busy, please retry", wait)
+
+    def _try_acquire(self):
+        """Take a free slot without waiting; the start time, or None when all are busy"""
+        with self._condition:
+            if self._active >= self.limit:
+                return None
+            self._active += 1
+            self.counters["admitted"] += 1
+            pipeline_in_flight.set(self._active)
+        return time.perf_counter()
+
+    def _acquire(self):
+        with self._condition:
+            if self._active < self.limit:
+                self._active += 1
+            else:
+                wait = self.expected_wait()
+                if wait > self.budget:
+                    self._shed("shed", wait)
+                self.counters["queued"] += 1
+                self._waiting += 1
+                try:
+                    deadline = time.monotonic() + self.budget
+                    while self._active >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._shed("timed_out", self.expected_wait())
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                self._active += 1
+            self.counters["admitted"] += 1
+            pipeline_in_flight.set(self._active)
+        return time.perf_counter()
+
+    def _release(self, started, served=True):
+        elapsed = time.perf_counter() - started
+        with self._condition:
+            self._active -= 1
+            if served:
+                self._avg_service = elapsed if not self._avg_service else 0.8 * self._avg_service + 0.2 * elapsed
+            pipeline_in_flight.set(self._active)
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the duration of the block (raises Overloaded)"""
+        started = self._acquire()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def _release_abandoned(self, acquiring):
+        """Give back a slot a worker thread won for a task that was cancelled meanwhile"""
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self._release(acquiring.result(), served=False)
+
+    @asynccontextmanager
+    async def admit_async(self):
+        """Async variant; never blocks the event loop, and only waits in a worker thread when there is a queue"""
+        started = self._try_acquire()
+        if started is None:
+            acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire))
+            try:
+                # Shielded: the thread cannot be stopped, so its slot must be released when it arrives
+                started = await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                acquiring.add_done_callback(self._release_abandoned)
+                raise
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def metrics(self):
+        with self._condition:
+            return dict(self.counters, active=self._active, waiting=self._waiting, limit=self.limit,
+                        avg_service_ms=round(self._avg_service * 1000, 1),
+                        expected_wait_ms=round(self.expected_wait() * 1000, 1))
+
+def client_key(api_key, remote_addr, forwarded_for=None):
+    """Bucket key for a request: a known API key, else the client IP"""
+    if api_key and api_key in API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    if RATE_LIMIT_TRUST_PROXY and forwarded_for:
+        remote_addr = forwarded_for.split(",")[0].strip()
+    return f"ip:{remote_addr or 'unknown'}"
+
+def create_rate_limiter(per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, table="rate_limit_buckets"):
+    store = None
+    if RATE_LIMIT_DB_PATH:
+        try:
+            store = SQLiteBucketStore(RATE_LIMIT_DB_PATH, table=table)
+        except sqlite3.Error as e:
+            print(f"⚠️ Rate limit store unavailable, using in-memory buckets: {e}")
+    return RateLimiter(per_minute, burst, store=store)
+
+rate_limiter = create_rate_limiter()
+batch_rate_limiter = create_rate_limiter(BATCH_RATE_LIMIT_PER_MINUTE, BATCH_RATE_LIMIT_BURST,
+                                         table="batch_rate_limit_buckets")
+pipeline_gate = ConcurrencyGate()
+
+def admission_metrics():
+    return {"enabled": ADMISSION_ENABLED, "rate_limit": rate_limiter.metrics(),
+            "batch_rate_limit": batch_rate_limiter.metrics(), "pipeline": pipeline_gate.metrics()}
@@ -1,20 +1,30 @@
 import os
+import json
+import importlib.util
+import threading
+import queue
+import base64
+import zlib
 import logging
-from datetime import datetime
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash
+import itertools
+import click
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from markupsafe import Markup
+from flask import Flask, g, request, jsonify, render_template, redirect, url_for, flash, Response, stream_with_context
+from sqlalchemy import func, tuple_, text
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 load_dotenv()  # This loads variables from .env file into environment
-# Import AI components only if available
-try:
-    from langgraph.graph import StateGraph, END
-    from langgraph_nodes import AlertFilterState, user_input_node, validation_node, geo_verification_node
-    AI_ENABLED = True
-except ImportError:
+# Check for AI components without importing them - LangGraph and the model
+# are loaded lazily (or warmed in the background) to keep startup fast
+AI_ENABLED = all(importlib.util.find_spec(name) is not None for name in ("langgraph", "geopy"))
+if not AI_ENABLED:
     print("⚠️ AI components not available, running in basic mode")
-    AI_ENABLED = False
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -36,71 +46,354 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with the extension
 db.init_app(app)
 
-# Build LangGraph workflow if AI components available
-if AI_ENABLED:
-    graph_builder = StateGraph(AlertFilterState)
-    graph_builder.add_node("user_input", user_input_node)
-    graph_builder.add_node("validation", validation_node)
-    graph_builder.add_node("geo_verification", geo_verification_node)
-
-    graph_builder.set_entry_point("user_input")
-    graph_builder.add_edge("user_input", "validation")
-    graph_builder.add_edge("validation", "geo_verification")
-    graph_builder.add_edge("geo_verification", END)
-
-    app_graph = graph_builder.compile()#eturns a compiled graph object almost similar to a dictionary containg nides,edes and other metadata
-else:
-    app_graph = None
-
-with app.app_context():
-    # Import models here so their tables are created
-    from models import CrimeReport
+import telemetry
+from telemetry import instrument_node
+telemetry.instrument_database()
+
+app_graph = None
+_graph_lock = threading.Lock()
+
+def get_app_graph():
+    """Build the LangGraph workflow on first use (None if AI components are unavailable)"""
+    global app_graph
+    if app_graph is not None or not AI_ENABLED:
+        return app_graph
+
+    with _graph_lock:
+        if app_graph is None:
+            from langgraph.graph import StateGraph, END
+            from langgraph_nodes import AlertFilterState, user_input_node, validation_node, geo_verification_node
+
+            graph_builder = StateGraph(AlertFilterState)
+            graph_builder.add_node("user_input", instrument_node("user_input", user_input_node))
+            graph_builder.add_node("validation", instrument_node("validation", validation_node))
+            graph_builder.add_node("geo_verification", instrument_node("geo_verification", geo_verification_node))
+
+            graph_builder.set_entry_point("user_input")
+            graph_builder.add_edge("user_input", "validation")
+            graph_builder.add_edge("validation", "geo_verification")
+            graph_builder.add_edge("geo_verification", END)
+
+            app_graph = graph_builder.compile()#eturns a compiled graph object almost similar to a dictionary containg nides,edes and other metadata
+    return app_graph
+
+# Import models here so their tables are created
+from models import CrimeReport
+
+def init_db():
+    """Create tables and add columns/indexes that older databases predate"""
+    from schema import upgrade_schema
     db.create_all()
+    upgrade_schema()
+
+# Set SKIP_DB_INIT=1 when the schema is managed separately (flask init-db)
+if os.environ.get("SKIP_DB_INIT", "0") != "1":
+    with app.app_context():
+        init_db()
+
+from corroboration import corroboration_index, apply_corroboration
+
+def load_corroboration_index():
+    """Index the recent stored reports that new ones are corroborated against"""
+    try:
+        count = corroboration_index.rebuild()
+        app.logger.info(f"Corroboration index loaded with {count} recent reports")
+    except Exception as e:
+        app.logger.error(f"Error loading corroboration index: {str(e)}")
+
+if AI_ENABLED:
+    with app.app_context():
+        load_corroboration_index()
+
+def warm_up():
+    """Build the graph and load the model ahead of the first report"""
+    try:
+        get_app_graph()
+        import model_utils
+        model_utils.load_model()
+    except Exception as e:
+        app.logger.error(f"Error during warm-up: {str(e)}")
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+def start_warm_up():
+    """Run warm_up in a daemon thread unless one is already running"""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None or not _warm_up_thread.is_alive():
+            _warm_up_thread = threading.Thread(target=warm_up, name="app-warmup", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+if AI_ENABLED and os.environ.get("MODEL_LOAD_MODE", "background").lower() == "background":
+    start_warm_up()
+
+from cache_store import MISSING, TTLLRUCache
+from dedup import content_hash, deduplicator
+from persistence import VERIFIED_THRESHOLD, TEXT_PREVIEW_LENGTH, should_store, build_report_row, save_report, save_reports, report_summary
+from events import broker, RESYNC
+from write_behind import create_writer
+from stats import category_totals, category_series, rebuild_stats, BUCKETS
+from spatial import parse_bbox, parse_near, filter_bbox, filter_near, within_radius, backfill_geohashes
+from clusters import clusters, heatmap, rebuild_clusters
+from export import EXPORT_FORMATS, parse_export_filters, stream_export
+from hotspots import HOTSPOT_MIN_COUNT, HOTSPOT_Z_THRESHOLD, hotspot_engine
+from response_cache import (DASHBOARD_CACHE_ENABLED, COMPRESS_MIN_SIZE, COMPRESSIBLE_MIMETYPES, choose_encoding,
+                            compress, data_version, dashboard_cache)
+from read_store import report_store, htmlsafe_json
+from admission import (ADMISSION_ENABLED, AdmissionRejected, client_key, rate_limiter, batch_rate_limiter,
+                       pipeline_gate, admission_metrics)
+
+# Bulk ingestion settings
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "64"))
+batch_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("BATCH_WORKERS", "8")),
+                                    thread_name_prefix="batch-pipeline")
+
+# Write-behind persistence: /api/process returns a provisional id and a
+# background writer group-commits accepted reports
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "0") == "1"
+report_writer = create_writer(app) if WRITE_BEHIND else None
+
+# Whole-pipeline results for exact resubmissions
+PIPELINE_CACHE_TTL = int(os.environ.get("PIPELINE_CACHE_TTL", "300"))
+pipeline_cache = TTLLRUCache(int(os.environ.get("PIPELINE_CACHE_SIZE", "2048")))
+
+# /api/reports paging
+REPORTS_PAGE_SIZE = int(os.environ.get("REPORTS_PAGE_SIZE", "500"))
+REPORTS_MAX_PAGE_SIZE = 2000
+
+# Live feed keep-alive interval (seconds)
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", "15"))
+
+# Endpoints charged one token per request; /api/process/batch draws per report from batch_rate_limiter
+RATE_LIMITED_ENDPOINTS = {"process_alert"}
+
+@app.before_request
+def begin_trace():
+    """Start a per-request trace, continuing the caller's X-Trace-Id if it is a valid id"""
+    if telemetry.TELEMETRY_ENABLED:
+        g.trace, g.trace_token = telemetry.start_trace(request.headers.get("X-Trace-Id"))
+
+def request_client_key():
+    return client_key(request.headers.get("X-API-Key"), request.remote_addr, request.headers.get("X-Forwarded-For"))
+
+@app.before_request
+def check_rate_limit():
+    """Per-client token bucket in front of the pipeline endpoints"""
+    if ADMISSION_ENABLED and request.endpoint in RATE_LIMITED_ENDPOINTS:
+        rate_limiter.check(request_client_key())
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    """429 (rate limited) or 503 (overloaded) with Retry-After"""
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.status_code = e.status
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli for HTML and JSON bodies the dashboard cache did not already compress"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None or (response.content_length or 0) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The bytes now depend on Accept-Encoding, so an existing ETag can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.after_request
+def finish_trace(response):
+    """Record request latency and return the trace id and span timings"""
+    trace = g.pop("trace", None)
+    if trace is None:
+        return response
+    telemetry.end_trace(g.pop("trace_token"))
+    telemetry.http_request_seconds.observe(
+        time.perf_counter() - trace.started,
+        endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+        method=request.method,
+        status=response.status_code
+    )
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if trace.spans:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+def cached_response(key, render):
+    """Serve `render()` through the dashboard cache, with conditional GET and compression.
+
+    Only 200 responses are cached; anything else is returned as rendered.
+    """
+    if not DASHBOARD_CACHE_ENABLED:
+        return render()
+    entry = dashboard_cache.get(key)
+    if entry is None:
+        version = data_version.value
+        response = render()
+        if response.status_code != 200:
+            return response
+        entry = dashboard_cache.put(key, version, response.get_data(), response.content_type)
 
-def calculate_stats(reports):
-    """Calculate statistics from crime reports for the dashboard"""
-    stats = {}
-    for report in reports:
-        category = report.category or "Unknown"
-        stats[category] = stats.get(category, 0) + 1
-    return stats
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(entry.etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and int(entry.last_modified) <= since.timestamp()
+    if not_modified:
+        dashboard_cache.count("not_modified")
+        response = Response(status=304)
+    else:
+        encoding = choose_encoding(request.accept_encodings)
+        response = Response(entry.body(encoding), content_type=entry.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(entry.etag, weak=True)
+    response.last_modified = int(entry.last_modified)
+    response.vary.add("Accept-Encoding")
+    # Browsers revalidate every time; unchanged data costs a 304
+    response.cache_control.no_cache = True
+    return response
+
+def newest_reports(limit, detail):
+    """(map JSON, count, newest `detail` rows) of the newest verified reports"""
+    if report_store.enabled:
+        report_store.sync(latest_report_id())
+        newest = report_store.newest(limit, detail)
+        if newest is not None:
+            return newest
+    # Only the columns the page uses, with the text already cut to preview length
+    verified_reports = db.session.query(
+        CrimeReport.id, CrimeReport.latitude, CrimeReport.longitude, CrimeReport.category,
+        CrimeReport.trust_score, CrimeReport.timestamp,
+        func.substr(CrimeReport.original_text, 1, TEXT_PREVIEW_LENGTH + 1).label('original_text')
+    ).filter(
+        CrimeReport.trust_score > VERIFIED_THRESHOLD,
+        CrimeReport.canonical_id.is_(None)
+    ).order_by(CrimeReport.timestamp.desc(), CrimeReport.id.desc()).limit(limit).all()
+    reports_json = htmlsafe_json([report_summary(row._mapping) for row in verified_reports])
+    return reports_json, len(verified_reports), verified_reports[:detail]
+
+def render_dashboard():
+    """Render index.html from the newest verified reports and the category counters"""
+    reports_json, report_count, recent_alerts = newest_reports(50, 10)
+    
+    # Statistics for the chart come from the materialized counters
+    stats = category_totals()
+    
+    app.logger.info(f"Loaded {report_count} verified reports")
+    app.logger.info(f"Statistics: {stats}")
+    
+    # Recent alerts for the sidebar are the newest 10 of the same reports
+    return Response(render_template('index.html',
+                                    reports_json=Markup(reports_json),
+                                    report_count=report_count,
+                                    statistics=stats,
+                                    recent_alerts=recent_alerts),
+                    mimetype='text/html')
 
 @app.route('/')
 def home():
     """Main dashboard route - serves the complete dashboard with data"""
     try:
-        # Query verified reports (trust score > 0.5)
-        verified_reports = CrimeReport.query.filter(
-            CrimeReport.trust_score > 0.5
-        ).order_by(CrimeReport.timestamp.desc()).limit(50).all()
-        
-        # Calculate statistics for the chart
-        stats = calculate_stats(verified_reports)
-        
-        # Get recent alerts for the sidebar (last 10)
-        recent_alerts = CrimeReport.query.filter(
-            CrimeReport.trust_score > 0.5
-        ).order_by(CrimeReport.timestamp.desc()).limit(10).all()
-        
-        # Convert reports to dictionaries for JSON serialization
-        reports_dict = [report.to_dict() for report in verified_reports]
-        
-        app.logger.info(f"Loaded {len(verified_reports)} verified reports")
-        app.logger.info(f"Statistics: {stats}")
-        
-        return render_template('index.html', 
-                             reports=reports_dict, 
-                             statistics=stats,
-                             recent_alerts=recent_alerts)
+        return cached_response('home', render_dashboard)
     
     except Exception as e:
         app.logger.error(f"Error loading dashboard: {str(e)}")
         flash(f"Error loading dashboard: {str(e)}", "error")
         return render_template('index.html', 
-                             reports=[], 
+                             reports_json=Markup('[]'),
+                             report_count=0,
                              statistics={},
                              recent_alerts=[])
 
+def build_initial_state(user_report, user_lat, user_lng):
+    """Initialize pipeline state with user GPS location if provided"""
+    return {
+        "user_report": user_report,
+        "trust_score": 1.0,
+        "gps_location": (user_lat, user_lng) if user_lat and user_lng else (0.0, 0.0),
+        "alert_type": ""
+    }
+
+def pipeline_cache_key(user_report, user_lat, user_lng):
+    return (content_hash(user_report), user_lat, user_lng)
+
+def cached_pipeline_result(cache_key, user_report):
+    """Corroborated result of an identical earlier submission, or None"""
+    cached = pipeline_cache.get(cache_key)
+    if cached is MISSING:
+        return None
+    return apply_corroboration(dict(cached, user_report=user_report))
+
+def finish_pipeline(cache_key, result):
+    """Cache a fresh graph result, then corroborate it"""
+    # Cached before corroboration, which changes as reports are stored
+    pipeline_cache.set(cache_key, result, PIPELINE_CACHE_TTL)
+    result = apply_corroboration(result)
+    telemetry.trust_scores.observe(result["trust_score"])
+    return result
+
+def run_pipeline(user_report, user_lat=0.0, user_lng=0.0):
+    """Run a report through the AI workflow if available, otherwise use fallback"""
+    graph = get_app_graph()
+    if graph:
+        # Identical resubmissions (same text and location) skip the whole graph
+        cache_key = pipeline_cache_key(user_report, user_lat, user_lng)
+        cached = cached_pipeline_result(cache_key, user_report)
+        if cached is not None:
+            return cached
+        # Bounded concurrency: excess requests queue briefly or are shed
+        with pipeline_gate.admit() if ADMISSION_ENABLED else nullcontext():
+            result = graph.invoke(build_initial_state(user_report, user_lat, user_lng))
+        return finish_pipeline(cache_key, result)
+
+    # Simple fallback processing without AI
+    return {
+        'user_report': user_report,
+        'trust_score': 0.8,  # Default trust score
+        'gps_location': (user_lat, user_lng) if user_lat and user_lng else (6.6018, 3.3515),  # Lagos default
+        'location_source': 'gps' if user_lat and user_lng else 'default',
+        'alert_type': 'Crime Report'  # Generic category
+    }
+
+def store_report(user_report, result):
+    """Queue (write-behind) or save an accepted report; returns (response payload, status code)"""
+    row = build_report_row(user_report, result)
+    if report_writer:
+        try:
+            provisional_id = report_writer.submit(row)
+            app.logger.info(f"Queued crime report {provisional_id}")
+            return {
+                "success": True,
+                "message": "Report processed and queued for saving",
+                "result": result,
+                "queued": True,
+                "provisional_id": provisional_id
+            }, 202
+        except queue.Full:
+            app.logger.warning("Write-behind queue full, saving synchronously")
+
+    crime_report = save_report(row)
+
+    app.logger.info(f"Saved crime report with ID: {crime_report.id}")
+
+    return {
+        "success": True,
+        "message": "Report processed and saved successfully",
+        "result": result,
+        "report_id": crime_report.id
+    }, 200
+
 @app.route('/api/process', methods=['POST'])
 def process_alert():
     """Process crime report through AI pipeline and save to database"""
@@ -115,50 +408,12 @@ def process_alert():
         
         app.logger.info(f"Processing report: {user_report[:100]}...")
         
-        # Initialize state with user GPS location if provided
-        initial_state = {
-            "user_report": user_report,
-            "trust_score": 1.0,
-            "gps_location": (user_lat, user_lng) if user_lat and user_lng else (0.0, 0.0),
-            "alert_type": ""
-        }
-        
-        # Process through AI workflow if available, otherwise use fallback
-        if AI_ENABLED and app_graph:
-            result = app_graph.invoke(initial_state)
-        else:
-            # Simple fallback processing without AI
-            result = {
-                'user_report': user_report,
-                'trust_score': 0.8,  # Default trust score
-                'gps_location': (user_lat, user_lng) if user_lat and user_lng else (6.6018, 3.3515),  # Lagos default
-                'alert_type': 'Crime Report'  # Generic category
-            }
+        result = run_pipeline(user_report, user_lat, user_lng)
         
         # Save to database if trust score is decent
-        if result.get('trust_score', 0) > 0.3:
-            crime_report = CrimeReport(
-                original_text=user_report,
-                predicted_label=result.get('alert_type', 'unknown'),
-                confidence=0.8,  # This would come from the model in a real scenario
-                trust_score=result.get('trust_score', 0),
-                latitude=result['gps_location'][0],
-                longitude=result['gps_location'][1],
-                category=result.get('alert_type', 'Unknown').title(),
-                timestamp=datetime.utcnow()
-            )
-            
-            db.session.add(crime_report)
-            db.session.commit()
-            
-            app.logger.info(f"Saved crime report with ID: {crime_report.id}")
-            
-            return jsonify({
-                "success": True,
-                "message": "Report processed and saved successfully",
-                "result": result,
-                "report_id": crime_report.id
-            })
+        if should_store(result):
+            payload, status = store_report(user_report, result)
+            return jsonify(payload), status
         else:
             app.logger.info("Report rejected due to low trust score")
             return jsonify({
@@ -167,35 +422,529 @@ def process_alert():
                 "result": result
             })
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         app.logger.error(f"Error processing alert: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def parse_batch_payload(req):
+    """Yield (index, item) pairs from an NDJSON body or a JSON array body"""
+    body = req.get_data(as_text=True)
+    if req.mimetype in NDJSON_MIMETYPES:
+        for index, line in enumerate(line for line in body.splitlines() if line.strip()):
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, ValueError(f"Invalid JSON line: {e}")
+        return
+
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of reports")
+    yield from enumerate(items)
+
+def process_batch_item(index, item):
+    """Run one batch entry through the pipeline; never raises"""
+    if isinstance(item, Exception):
+        return {"index": index, "success": False, "error": str(item)}
+    if not isinstance(item, dict) or not item.get('report'):
+        return {"index": index, "success": False, "error": "No report provided"}
+    try:
+        result = run_pipeline(item['report'], item.get('latitude', 0.0), item.get('longitude', 0.0))
+        return {"index": index, "success": True, "report": item['report'], "result": result}
+    except AdmissionRejected as e:
+        return {"index": index, "success": False, "error": str(e), "retry_after": e.retry_after}
+    except Exception as e:
+        return {"index": index, "success": False, "error": str(e)}
+
+def batch_result_line(outcome):
+    """Serialize a per-report batch outcome as one NDJSON line"""
+    outcome.pop("report", None)
+    return json.dumps(outcome, default=str) + "\n"
+
+@app.route('/api/process/batch', methods=['POST'])
+def process_batch():
+    """Process many reports (NDJSON or JSON array) and stream results back as NDJSON"""
+    try:
+        items = parse_batch_payload(request)
+        first = next(items, None)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch payload: {e}"}), 400
+    if first is None:
+        return jsonify({"error": "No reports provided"}), 400
+    # One token per report from the client's batch bucket (BATCH_RATE_LIMIT_BURST reports at once)
+    rate_limit_key = request_client_key() if ADMISSION_ENABLED else None
+    if rate_limit_key:
+        batch_rate_limiter.check(rate_limit_key)  # the first report; rejected -> 429 for the whole batch
+
+    def admit(index):
+        """None if the report may run, else its rate-limited outcome"""
+        if rate_limit_key is None or index == first[0]:
+            return None
+        try:
+            batch_rate_limiter.check(rate_limit_key)
+        except AdmissionRejected as e:
+            return {"index": index, "success": False, "error": str(e), "retry_after": e.retry_after}
+        return None
+
+    def generate():
+        pending = itertools.chain([first], items)
+        while True:
+            chunk = list(itertools.islice(pending, BATCH_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            admitted = []
+            for index, item in chunk:
+                rejection = admit(index)
+                if rejection:
+                    yield batch_result_line(rejection)
+                else:
+                    admitted.append((index, item))
+
+            # Run the chunk concurrently so the inference engine can batch the model calls
+            futures = [batch_executor.submit(process_batch_item, index, item) for index, item in admitted]
+            accepted = []
+            for future in as_completed(futures):
+                outcome = future.result()
+                if outcome["success"] and should_store(outcome["result"]):
+                    accepted.append(outcome)
+                else:
+                    if outcome["success"]:
+                        outcome.update(success=False, message="Report could not be verified")
+                    yield batch_result_line(outcome)
+
+            if not accepted:
+                continue
+            try:
+                report_ids = save_reports([build_report_row(o["report"], o["result"]) for o in accepted])
+                app.logger.info(f"Saved batch chunk of {len(report_ids)} crime reports")
+                for outcome, report_id in zip(accepted, report_ids):
+                    outcome.update(report_id=report_id, message="Report processed and saved successfully")
+                    yield batch_result_line(outcome)
+            except Exception as e:
+                app.logger.error(f"Error saving batch chunk: {str(e)}")
+                for outcome in accepted:
+                    outcome.update(success=False, error=f"Database error: {e}")
+                    yield batch_result_line(outcome)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def encode_cursor(timestamp, report_id):
+    """Opaque keyset cursor for the (timestamp, id) position of a row"""
+    raw = json.dumps([timestamp.isoformat(), report_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, report_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(report_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def latest_report_id():
+    return db.session.query(func.max(CrimeReport.id)).scalar() or 0
+
+def reports_etag(latest_id=None):
+    """ETag from the latest report id and the query string - cheap to compute"""
+    if latest_id is None:
+        latest_id = latest_report_id()
+    return f"reports-{latest_id}-{zlib.crc32(request.query_string):08x}"
+
+def reports_page_response(body, etag, last):
+    """A /api/reports page, with X-Next-Cursor and Link pointing after `last` (timestamp, id)"""
+    if not isinstance(body, bytes):
+        # Escaped like the read store's fragments, so both paths give identical bytes for one ETag
+        body = (htmlsafe_json(body) + "\n").encode()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if last is not None:
+        next_cursor = encode_cursor(*last)
+        next_args = request.args.to_dict()
+        next_args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_reports", **next_args)}>; rel="next"'
+    return response
+
+@app.route('/api/process/status/<provisional_id>')
+def process_status(provisional_id):
+    """Status of a report accepted with write-behind: queued, saved (with report_id) or failed"""
+    status = report_writer.status(provisional_id) if report_writer else None
+    if status is None:
+        return jsonify({"error": "Unknown provisional id"}), 404
+    return jsonify(status)
+
 @app.route('/api/reports')
 def get_reports():
-    """API endpoint to get all verified reports (for AJAX if needed)"""
+    """API endpoint to get verified reports, newest first, one keyset page at a time.
+
+    Optional filters: ?bbox= or ?near=&radius_km=; duplicates of an earlier
+    report are left out unless ?include_duplicates=1. Paging: ?limit= and
+    ?cursor= (taken from the X-Next-Cursor header of the previous page).
+
+    Pages within the newest READ_STORE_SIZE reports are served from the
+    in-memory read store; the rest come from the database.
+    """
     try:
-        verified_reports = CrimeReport.query.filter(
-            CrimeReport.trust_score > 0.5
-        ).order_by(CrimeReport.timestamp.desc()).all()
+        latest_id = latest_report_id()
+        etag = reports_etag(latest_id)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        include_duplicates = request.args.get('include_duplicates') == '1'
+        cursor = bbox = near = None
+        try:
+            limit = min(max(int(request.args.get('limit', REPORTS_PAGE_SIZE)), 1), REPORTS_MAX_PAGE_SIZE)
+            if request.args.get('cursor'):
+                cursor = decode_cursor(request.args['cursor'])
+            if request.args.get('bbox'):
+                bbox = parse_bbox(request.args['bbox'])
+            elif request.args.get('near'):
+                near = parse_near(request.args['near'], request.args.get('radius_km'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if report_store.enabled and not include_duplicates:
+            report_store.sync(latest_id)
+            page = report_store.page(limit, cursor, bbox, near)
+            if page is not None:
+                body, last = page
+                return reports_page_response(body, etag, last)
+
+        # Project only the columns the map needs, truncating the text in SQL
+        query = db.session.query(
+            CrimeReport.id,
+            CrimeReport.latitude,
+            CrimeReport.longitude,
+            CrimeReport.category,
+            CrimeReport.trust_score,
+            CrimeReport.timestamp,
+            func.substr(CrimeReport.original_text, 1, TEXT_PREVIEW_LENGTH).label('text_preview'),
+            func.length(CrimeReport.original_text).label('text_length')
+        ).filter(CrimeReport.trust_score > VERIFIED_THRESHOLD)
+        if not include_duplicates:
+            query = query.filter(CrimeReport.canonical_id.is_(None))
+        exact_check = None
+        
+        if cursor:
+            query = query.filter(tuple_(CrimeReport.timestamp, CrimeReport.id) < tuple_(*cursor))
+        if bbox:
+            query = filter_bbox(query, *bbox)
+        elif near:
+            query = filter_near(query, *near)
+            exact_check = within_radius(*near)
+        
+        query = query.order_by(CrimeReport.timestamp.desc(), CrimeReport.id.desc())
+        if exact_check:
+            # The distance check runs in Python, so keep reading until the page is full
+            rows = []
+            for row in query.yield_per(limit + 1):
+                if exact_check(row):
+                    rows.append(row)
+                    if len(rows) > limit:
+                        break
+        else:
+            rows = query.limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         reports_data = []
-        for report in verified_reports:
+        for row in rows:
             reports_data.append({
-                'id': report.id,
-                'latitude': report.latitude,
-                'longitude': report.longitude,
-                'category': report.category,
-                'trust_score': report.trust_score,
-                'timestamp': report.timestamp.isoformat(),
-                'original_text': report.original_text[:100] + '...' if len(report.original_text) > 100 else report.original_text
+                'id': row.id,
+                'latitude': row.latitude,
+                'longitude': row.longitude,
+                'category': row.category,
+                'trust_score': row.trust_score,
+                'timestamp': row.timestamp.isoformat(),
+                'original_text': row.text_preview + '...' if row.text_length > TEXT_PREVIEW_LENGTH else row.text_preview
             })
         
-        return jsonify(reports_data)
+        return reports_page_response(reports_data, etag, (rows[-1].timestamp, rows[-1].id) if has_more else None)
     
     except Exception as e:
         app.logger.error(f"Error fetching reports: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def aggregate_response(build):
+    """Shared handling of /api/clusters and /api/heatmap: ?z=, ?bbox=, ?category=, ETag"""
+    try:
+        etag = reports_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        try:
+            zoom = int(request.args.get('z', 10))
+        except ValueError:
+            return jsonify({"error": "z must be an integer"}), 400
+        try:
+            bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = jsonify(build(zoom, bbox, request.args.get('category')))
+        response.set_etag(etag)
+        return response
+
+    except Exception as e:
+        app.logger.error(f"Error fetching map aggregates: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/clusters')
+def get_clusters():
+    """Pre-aggregated report clusters for the map view: ?z=<zoom>&bbox=west,south,east,north"""
+    return aggregate_response(clusters)
+
+@app.route('/api/heatmap')
+def get_heatmap():
+    """Heatmap grid of report counts for the map view: ?z=<zoom>&bbox=west,south,east,north"""
+    return aggregate_response(heatmap)
+
+@app.route('/api/hotspots')
+def get_hotspots():
+    """Emerging hotspots: map cells whose recent report count spikes above their baseline.
+
+    Optional: ?category=, ?min_count=, ?threshold= (z-score), ?limit=
+    """
+    try:
+        try:
+            min_count = int(request.args.get('min_count', HOTSPOT_MIN_COUNT))
+            threshold = float(request.args.get('threshold', HOTSPOT_Z_THRESHOLD))
+            limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        except ValueError:
+            return jsonify({"error": "min_count and limit must be integers and threshold a number"}), 400
+        category = request.args.get('category') or None
+
+        def render():
+            hotspots = hotspot_engine.detect(category, min_count=min_count, threshold=threshold, limit=limit)
+            return jsonify(dict(hotspot_engine.settings(), category=category, min_count=min_count,
+                                threshold=threshold, generated_at=datetime.utcnow().isoformat(),
+                                hotspots=hotspots))
+        return cached_response(f"hotspots?{request.query_string.decode()}", render)
+
+    except Exception as e:
+        app.logger.error(f"Error detecting hotspots: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export')
+def export_reports():
+    """Stream all stored reports as ?format=csv|ndjson|parquet.
+
+    Filters: ?since= and ?until= (ISO timestamps), ?category= (repeatable or
+    comma-separated), ?min_trust=, ?include_duplicates=1.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    try:
+        filters = parse_export_filters(request.args)
+        chunks = stream_export(fmt, filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"crime_reports_{datetime.utcnow():%Y%m%dT%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/stream')
+def stream_reports():
+    """Server-sent events feed of newly verified reports.
+
+    Clients resume with the Last-Event-ID header (sent automatically by
+    EventSource on reconnect). A 'resync' event means events were missed and
+    the client should refetch /api/reports. Each open stream holds a worker
+    thread, so run gunicorn with threaded or async workers.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    subscription = broker.subscribe(last_event_id)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=STREAM_HEARTBEAT)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield event.to_sse()
+                if event is RESYNC:
+                    return
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+def parse_window(value):
+    """Parse a window like '30m', '24h' or '7d' into a timedelta"""
+    try:
+        amount, unit = int(value[:-1]), WINDOW_UNITS[value[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError("window must look like '30m', '24h' or '7d'")
+    if amount <= 0:
+        raise ValueError("window must be positive")
+    return timedelta(**{unit: amount})
+
+@app.route('/api/stats')
+def get_stats():
+    """Category statistics from the materialized counters.
+
+    ?window=24h (or ?since=/&until= ISO timestamps) limits the time range;
+    ?bucket=hour|day additionally returns a per-bucket series.
+    """
+    try:
+        try:
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+            if request.args.get('window'):
+                since = (until or datetime.utcnow()) - parse_window(request.args['window'])
+            elif request.args.get('since'):
+                since = datetime.fromisoformat(request.args['since'])
+            else:
+                since = None
+            bucket = request.args.get('bucket')
+            if bucket and bucket not in BUCKETS:
+                raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+            if bucket and since is None:
+                raise ValueError("bucket requires window or since")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        def render():
+            payload = {
+                "since": since.isoformat() if since else None,
+                "until": until.isoformat() if until else None,
+                "totals": category_totals(since, until)
+            }
+            if bucket:
+                payload["bucket"] = bucket
+                payload["series"] = category_series(bucket, since, until)
+            return jsonify(payload)
+        return cached_response(f"stats?{request.query_string.decode()}", render)
+    
+    except Exception as e:
+        app.logger.error(f"Error fetching stats: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Cache hit rates and inference batching statistics as JSON"""
+    metrics = {
+        "write_behind": report_writer.metrics() if report_writer else None,
+        "dedup": deduplicator.stats(),
+        "pipeline_cache": pipeline_cache.stats(),
+        "admission": admission_metrics(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "read_store": report_store.stats()
+    }
+    if AI_ENABLED:
+        import model_utils
+        import geo_utils
+        metrics["inference"] = model_utils.inference_metrics()
+        metrics["geocode_cache"] = geo_utils.geocode_cache_stats()
+        metrics["geocoder"] = geo_utils.geocoder_metrics()
+        metrics["corroboration"] = corroboration_index.stats()
+    return jsonify(metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    if not telemetry.TELEMETRY_ENABLED:
+        return jsonify({"error": "Telemetry is disabled (TELEMETRY_ENABLED=0)"}), 404
+    return Response(telemetry.registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the database answers and the model (if used) has finished loading.
+
+    A readiness probe may be the only traffic a lazily loaded instance gets, so
+    the first probe starts the load in the background and reports "loading".
+    """
+    checks = {"database": True, "model": None, "graph": None}
+    status = None
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        app.logger.error(f"Readiness database check failed: {str(e)}")
+        checks["database"] = False
+
+    if AI_ENABLED:
+        import model_utils
+        checks["graph"] = app_graph is not None
+        ready = checks["database"] and checks["graph"] and model_utils.is_model_ready()
+        if checks["database"] and not ready:
+            start_warm_up()
+            status = "loading"
+        checks["model"] = model_utils.model_status()
+    else:
+        ready = checks["database"]
+
+    status = status or ("ready" if ready else "unavailable")
+    return jsonify({"ready": bool(ready), "status": status, "checks": checks}), 200 if ready else 503
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create tables and upgrade the schema of an existing database"""
+    init_db()
+    print("✅ Database initialized")
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute the category statistics counters from all reports"""
+    counted = rebuild_stats()
+    print(f"✅ Rebuilt statistics from {counted} verified reports")
+
+@app.cli.command("rebuild-clusters")
+def rebuild_clusters_command():
+    """Recompute the map cluster cells from all reports"""
+    counted = rebuild_clusters()
+    print(f"✅ Rebuilt map clusters from {counted} verified reports")
+
+@app.cli.command("export-reports")
+@click.option("--format", "fmt", type=click.Choice(list(EXPORT_FORMATS)), default="csv")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), required=True)
+@click.option("--since", help="ISO timestamp (inclusive)")
+@click.option("--until", help="ISO timestamp (exclusive)")
+@click.option("--category", multiple=True, help="Repeat to export several categories")
+@click.option("--min-trust", type=float)
+@click.option("--include-duplicates", is_flag=True)
+def export_reports_command(fmt, output, since, until, category, min_trust, include_duplicates):
+    """Export crime reports to a CSV, NDJSON or Parquet file (e.g. for retraining)"""
+    args = {"since": since, "until": until, "category": ",".join(category),
+            "min_trust": "" if min_trust is None else str(min_trust),
+            "include_duplicates": "1" if include_duplicates else "0"}
+    chunks = stream_export(fmt, parse_export_filters(args))
+    with open(output, "wb" if fmt == "parquet" else "w", newline="" if fmt != "parquet" else None,
+              encoding=None if fmt == "parquet" else "utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    print(f"✅ Exported crime reports to {output}")
+
+@app.cli.command("backfill-geohash")
+def backfill_geohash_command():
+    """Compute geohashes for existing crime reports"""
+    updated = backfill_geohashes()
+    print(f"✅ Backfilled geohash for {updated} reports")
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
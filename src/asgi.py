@@ -0,0 +1,139 @@
+"""ASGI entry point: `uvicorn asgi:application`
+
+POST /api/process is served natively by the async LangGraph workflow, where
+geocoding and classification run in parallel. Every other route is handed to
+the Flask app through asgiref's WSGI adapter.
+"""
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from asgiref.wsgi import WsgiToAsgi
+from app import (app, AI_ENABLED, build_initial_state, pipeline_cache_key, cached_pipeline_result,
+                 finish_pipeline, store_report)
+from persistence import should_store
+from admission import ADMISSION_ENABLED, AdmissionRejected, client_key, rate_limiter, pipeline_gate
+import telemetry
+
+wsgi_application = WsgiToAsgi(app)
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def _send_json(send, payload, status=200, extra_headers=()):
+    body = json.dumps(payload, default=str).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers.extend(extra_headers)
+    trace = telemetry.current_trace()
+    if trace is not None:
+        telemetry.http_request_seconds.observe(time.perf_counter() - trace.started,
+                                               endpoint="/api/process", method="POST", status=status)
+        headers.append((b"x-trace-id", trace.trace_id.encode()))
+        if trace.spans:
+            headers.append((b"server-timing", trace.server_timing().encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def _request_trace_id(scope):
+    return _header(scope, b"x-trace-id")
+
+def _client_key(scope):
+    client = scope.get("client")
+    return client_key(_header(scope, b"x-api-key"), client[0] if client else None,
+                      _header(scope, b"x-forwarded-for"))
+
+async def _check_rate_limit(scope):
+    """rate_limiter.check off the event loop when the buckets live in SQLite"""
+    if rate_limiter.blocking:
+        await asyncio.to_thread(rate_limiter.check, _client_key(scope))
+    else:
+        rate_limiter.check(_client_key(scope))
+
+async def _send_rejection(send, e):
+    await _send_json(send, {"error": str(e), "retry_after": e.retry_after}, e.status,
+                     [(b"retry-after", str(e.retry_after).encode())])
+
+def _store_in_app_context(user_report, result):
+    with app.app_context():
+        return store_report(user_report, result)
+
+async def process_alert_async(scope, receive, send):
+    """Async twin of app.process_alert with the same request/response shape"""
+    try:
+        if ADMISSION_ENABLED:
+            await _check_rate_limit(scope)
+        data = json.loads(await _read_body(receive) or b"{}")
+        user_report = data.get('report', '')
+        user_lat = data.get('latitude', 0.0)
+        user_lng = data.get('longitude', 0.0)
+
+        if not user_report:
+            return await _send_json(send, {"error": "No report provided"}, 400)
+
+        app.logger.info(f"Processing report (async): {user_report[:100]}...")
+        # Imported on first use so startup does not pay for LangGraph
+        from async_pipeline import run_pipeline_async
+        # Same pipeline cache as the WSGI path
+        cache_key = pipeline_cache_key(user_report, user_lat, user_lng)
+        result = cached_pipeline_result(cache_key, user_report)
+        if result is None:
+            async with pipeline_gate.admit_async() if ADMISSION_ENABLED else contextlib.nullcontext():
+                result = await run_pipeline_async(build_initial_state(user_report, user_lat, user_lng))
+            result = finish_pipeline(cache_key, result)
+
+        if should_store(result):
+            # Write-behind or a synchronous save; DB access stays off the event loop
+            payload, status = await asyncio.to_thread(_store_in_app_context, user_report, result)
+            return await _send_json(send, payload, status)
+
+        app.logger.info("Report rejected due to low trust score")
+        return await _send_json(send, {
+            "success": False,
+            "message": "Report could not be verified",
+            "result": result
+        })
+
+    except AdmissionRejected as e:
+        return await _send_rejection(send, e)
+    except Exception as e:
+        app.logger.error(f"Error processing alert: {str(e)}")
+        return await _send_json(send, {"error": str(e)}, 500)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if AI_ENABLED and "async_pipeline" in sys.modules:
+                await sys.modules["async_pipeline"].aclose_http_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+
+    if (AI_ENABLED and scope["type"] == "http"
+            and scope["path"] == "/api/process" and scope["method"] == "POST"):
+        if not telemetry.TELEMETRY_ENABLED:
+            return await process_alert_async(scope, receive, send)
+        _, token = telemetry.start_trace(_request_trace_id(scope))
+        try:
+            return await process_alert_async(scope, receive, send)
+        finally:
+            telemetry.end_trace(token)
+
+    return await wsgi_application(scope, receive, send)
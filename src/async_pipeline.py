@@ -0,0 +1,97 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from langgraph.graph import StateGraph, START, END
+from langgraph_nodes import AlertFilterState, DEFAULT_LOCATION, location_checked_trust
+from model_utils import model_classifier
+from geo_utils import get_coordinates_from_text_async, GEOCODER_MAX_CONNECTIONS, GEOCODER_TIMEOUT
+from telemetry import instrument_node
+
+# Classification runs in threads: torch releases the GIL during the forward
+# pass, and concurrent submissions are grouped by the batching engine.
+model_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MODEL_EXECUTOR_WORKERS", "8")),
+    thread_name_prefix="async-classifier"
+)
+
+_http_client = None
+_http_client_loop = None
+
+def get_http_client():
+    """Return the pooled AsyncClient for the running event loop, creating it if needed"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            timeout=GEOCODER_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=GEOCODER_MAX_CONNECTIONS,
+                max_keepalive_connections=GEOCODER_MAX_CONNECTIONS
+            )
+        )
+        _http_client_loop = loop
+    return _http_client
+
+async def aclose_http_client():
+    """Close the pooled client (call on ASGI shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+# Async nodes return partial state updates so the parallel branches never
+# write the same key.
+
+async def geocode_node(state: AlertFilterState):
+    """Extract location from user report text (network-bound branch)"""
+    if state["gps_location"] != (0.0, 0.0):
+        print(f" Using GPS coordinates: {state['gps_location']}")
+        return {"location_source": "gps"}
+
+    extracted_coords = await get_coordinates_from_text_async(state["user_report"], get_http_client())
+    if extracted_coords:
+        print(f" Extracted coordinates from text: {extracted_coords}")
+        return {"gps_location": extracted_coords, "location_source": "text"}
+
+    print(" No location found, using default coordinates (Lagos)")
+    return {"gps_location": DEFAULT_LOCATION, "location_source": "default"}
+
+async def classify_node(state: AlertFilterState):
+    """Classify the report and set initial trust score (CPU-bound branch)"""
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(model_executor, model_classifier, state["user_report"])
+
+    print(f"AI Classification: {result['predicted_label']} (trust: {result['trust_score']:.2f})")
+    return {"alert_type": result["predicted_label"], "trust_score": result["trust_score"]}
+
+async def geo_verification_node(state: AlertFilterState):
+    """Location cross-check, run once both branches are done (in-memory only)"""
+    extracted_coords = state["gps_location"]
+
+    if state.get("location_source") == "default":
+        print(" Skipping geo verification for default coordinates")
+        return {}
+
+    trust_score = location_checked_trust(state["user_report"], extracted_coords, state["trust_score"])
+    return {"trust_score": trust_score}
+
+def build_async_graph():
+    """Geocoding and classification fan out from START and join at geo_verification"""
+    graph_builder = StateGraph(AlertFilterState)
+    graph_builder.add_node("geocode", instrument_node("geocode", geocode_node))
+    graph_builder.add_node("classify", instrument_node("classify", classify_node))
+    graph_builder.add_node("geo_verification", instrument_node("geo_verification", geo_verification_node))
+
+    graph_builder.add_edge(START, "geocode")
+    graph_builder.add_edge(START, "classify")
+    graph_builder.add_edge(["geocode", "classify"], "geo_verification")
+    graph_builder.add_edge("geo_verification", END)
+
+    return graph_builder.compile()
+
+async_app_graph = build_async_graph()
+
+async def run_pipeline_async(initial_state):
+    """Run a report through the async workflow"""
+    return await async_app_graph.ainvoke(initial_state)
@@ -0,0 +1,52 @@
+"""Synthetic crime report corpus for benchmarks"""
+import random
+
+# Place names the stub Mapbox server knows, with approximate coordinates
+PLACES = {
+    "Yaba": (6.5095, 3.3711),
+    "Ikeja": (6.6018, 3.3515),
+    "Surulere": (6.5000, 3.3500),
+    "Lekki": (6.4698, 3.5852),
+    "Victoria Island": (6.4281, 3.4219),
+    "Ikorodu": (6.6194, 3.5105),
+    "Oshodi": (6.5550, 3.3430),
+    "Ajah": (6.4670, 3.5710),
+    "Festac": (6.4660, 3.2830),
+    "Mushin": (6.5270, 3.3540),
+}
+
+CRIMES = [
+    "armed robbery", "phone theft", "assault", "car theft", "burglary",
+    "kidnapping attempt", "street fight", "stolen motorcycle",
+]
+
+NOISE = [
+    "i think i saw aliens", "free airtime for everyone", "the weather is nice today",
+    "my cat is missing again lol", "test test test",
+]
+
+TEMPLATES = [
+    "{crime} happening now at {place}, please send help",
+    "There was a {crime} near {place} bus stop about ten minutes ago",
+    "{place}: two men involved in a {crime}, one had a gun",
+    "Reporting a {crime} around {place} market, people are running",
+    "Witnessed a {crime} in {place} this evening, police not yet around",
+]
+
+def generate_reports(count, seed=42, noise_ratio=0.15, gps_ratio=0.3):
+    """Return `count` report payloads as accepted by /api/process"""
+    rng = random.Random(seed)
+    places = list(PLACES)
+    reports = []
+    for _ in range(count):
+        if rng.random() < noise_ratio:
+            payload = {"report": rng.choice(NOISE)}
+        else:
+            place = rng.choice(places)
+            payload = {"report": rng.choice(TEMPLATES).format(crime=rng.choice(CRIMES), place=place)}
+            if rng.random() < gps_ratio:
+                lat, lng = PLACES[place]
+                payload["latitude"] = round(lat + rng.uniform(-0.01, 0.01), 6)
+                payload["longitude"] = round(lng + rng.uniform(-0.01, 0.01), 6)
+        reports.append(payload)
+    return reports
@@ -0,0 +1,303 @@
+"""Benchmark and load-test runner for the report pipeline.
+
+Runs fully offline: Mapbox is replaced by a local stub server and BERT by the
+"stub" inference backend. Run from src/:
+
+    python -m benchmarks.run nodes --iterations 500 --output nodes.json
+    python -m benchmarks.run e2e --requests 1000 --concurrency 16 --output e2e.json
+    python -m benchmarks.run compare --baseline baseline.json --current e2e.json --threshold 0.10
+
+Results are JSON; compare exits with status 1 when a metric regressed by more
+than the threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+from benchmarks.corpus import generate_reports
+from benchmarks.stubs import StubMapboxServer
+
+# For each metric: True if higher is better
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "mean_ms": False,
+    "throughput_rps": True,
+    "peak_rss_mb": False,
+}
+
+def configure_environment(mapbox_url, database_url=None):
+    """Point the app at the stubs; must run before any app module is imported"""
+    os.environ.setdefault("MODEL_BACKEND", "stub")
+    os.environ.setdefault("MODEL_LOAD_MODE", "eager")
+    os.environ["MAPBOX_TOKEN"] = "benchmark"
+    os.environ["MAPBOX_BASE_URL"] = mapbox_url
+    # Memory-only caches so runs don't warm each other up
+    os.environ["GEOCODE_CACHE_PATH"] = ""
+    os.environ["CLASSIFICATION_CACHE_PATH"] = ""
+    # Every benchmark request comes from one IP; keep the concurrency gate but not the rate limit
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+def summarize(latencies, elapsed, errors=0):
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+def clear_caches():
+    """Forget geocodes and classification verdicts so every call does the work"""
+    from geo_utils import geocode_cache
+    from dedup import deduplicator, DuplicateIndex
+    geocode_cache.memory.clear()
+    deduplicator.cache.memory.clear()
+    deduplicator.index = DuplicateIndex()
+
+def bench_nodes(args):
+    """Time each LangGraph node in isolation over the synthetic corpus"""
+    with StubMapboxServer(latency_ms=args.geocode_latency_ms) as mapbox:
+        configure_environment(mapbox.url)
+        import langgraph_nodes
+        from model_utils import load_model
+        load_model()
+
+        reports = generate_reports(args.iterations, seed=args.seed)
+        states = [
+            {
+                "user_report": report["report"],
+                "trust_score": 1.0,
+                "gps_location": (report.get("latitude", 0.0), report.get("longitude", 0.0)),
+                "alert_type": "",
+            }
+            for report in reports
+        ]
+        nodes = {
+            "user_input_node": langgraph_nodes.user_input_node,
+            "validation_node": langgraph_nodes.validation_node,
+            "geo_verification_node": langgraph_nodes.geo_verification_node,
+        }
+
+        results = {}
+        devnull = open(os.devnull, "w")
+        try:
+            for name, node in nodes.items():
+                if args.cold:
+                    clear_caches()
+                latencies = []
+                started = time.perf_counter()
+                for state in states:
+                    state = dict(state)
+                    # Nodes print progress; keep that out of the timings
+                    stdout, sys.stdout = sys.stdout, devnull
+                    try:
+                        call_started = time.perf_counter()
+                        node(state)
+                        latencies.append(time.perf_counter() - call_started)
+                    finally:
+                        sys.stdout = stdout
+                results[name] = summarize(latencies, time.perf_counter() - started)
+                print(f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+        finally:
+            devnull.close()
+
+        return {
+            "benchmark": "nodes",
+            "iterations": args.iterations,
+            "geocode_latency_ms": args.geocode_latency_ms,
+            "cold": args.cold,
+            "geocode_requests": mapbox.requests,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "nodes": results,
+        }
+
+def _post(url, payload, timeout):
+    body = json.dumps(payload).encode("utf-8")
+    req = urlrequest.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urlrequest.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+def bench_e2e(args):
+    """Drive POST /api/process on a live server at the requested concurrency"""
+    with tempfile.TemporaryDirectory() as tmpdir, StubMapboxServer(latency_ms=args.geocode_latency_ms) as mapbox:
+        configure_environment(mapbox.url, f"sqlite:///{os.path.join(tmpdir, 'benchmark.db')}")
+        from werkzeug.serving import make_server
+        from app import app
+        from model_utils import load_model
+        load_model()
+        # Request and connection-pool logging would dominate the timings
+        logging.getLogger().setLevel(logging.WARNING)
+        app.logger.setLevel(logging.WARNING)
+
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        server_thread = threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True)
+        server_thread.start()
+        url = f"http://127.0.0.1:{server.server_port}/api/process"
+
+        reports = generate_reports(args.requests, seed=args.seed)
+        for report in reports[:args.warmup]:
+            _post(url, report, args.timeout)
+
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def send(payload):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                status = _post(url, payload, args.timeout)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status is not None and status < 400:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+        devnull = open(os.devnull, "w")
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(send, reports))
+            elapsed = time.perf_counter() - started
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+            server.shutdown()
+
+        result = summarize(latencies, elapsed, errors)
+        print(f"e2e: {result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, "
+              f"p99 {result['p99_ms']} ms, {errors} errors", file=sys.stderr)
+        return dict(
+            result,
+            benchmark="e2e",
+            requests=args.requests,
+            concurrency=args.concurrency,
+            geocode_latency_ms=args.geocode_latency_ms,
+            geocode_requests=mapbox.requests,
+            peak_rss_mb=round(peak_rss_mb(), 1),
+        )
+
+def _flatten(result, prefix=""):
+    """Yield (name, value) for every compared metric in a result document"""
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif key in COMPARED_METRICS and isinstance(value, (int, float)):
+            yield f"{prefix}{key}", key, value
+
+def compare(baseline, current, threshold):
+    """List metrics of `current` that are worse than `baseline` by more than threshold"""
+    baseline_metrics = {name: value for name, _, value in _flatten(baseline)}
+    rows = []
+    for name, key, value in _flatten(current):
+        if name not in baseline_metrics:
+            continue
+        before = baseline_metrics[name]
+        change = (value - before) / before if before else 0.0
+        if COMPARED_METRICS[key]:
+            change = -change
+        rows.append({
+            "metric": name,
+            "baseline": before,
+            "current": value,
+            "change": round(change, 4),
+            "regressed": change > threshold,
+        })
+    return rows
+
+def run_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        marker = "❌" if row["regressed"] else "✅"
+        print(f"{marker} {row['metric']}: {row['baseline']} -> {row['current']} ({row['change']:+.1%} worse)",
+              file=sys.stderr)
+    regressions = [row for row in rows if row["regressed"]]
+    return {"benchmark": "compare", "threshold": args.threshold, "regressions": len(regressions), "metrics": rows}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    nodes = commands.add_parser("nodes", help="Microbenchmark each LangGraph node")
+    nodes.add_argument("--iterations", type=int, default=200)
+    nodes.add_argument("--cold", action="store_true", help="Clear geocode and classification caches before each node")
+
+    e2e = commands.add_parser("e2e", help="Load-test POST /api/process")
+    e2e.add_argument("--requests", type=int, default=500)
+    e2e.add_argument("--concurrency", type=int, default=8)
+    e2e.add_argument("--warmup", type=int, default=10)
+    e2e.add_argument("--timeout", type=float, default=30.0)
+
+    for command in (nodes, e2e):
+        command.add_argument("--seed", type=int, default=42)
+        command.add_argument("--geocode-latency-ms", type=float, default=20.0,
+                             help="Artificial latency of the stub Mapbox server")
+
+    comparison = commands.add_parser("compare", help="Flag regressions against a stored baseline")
+    comparison.add_argument("--baseline", required=True)
+    comparison.add_argument("--current", required=True)
+    comparison.add_argument("--threshold", type=float, default=0.10,
+                            help="Allowed relative slowdown before a metric counts as regressed")
+
+    for command in (nodes, e2e, comparison):
+        command.add_argument("--output", help="Write the JSON result here instead of stdout")
+
+    args = parser.parse_args(argv)
+    runner = {"nodes": bench_nodes, "e2e": bench_e2e, "compare": run_compare}[args.command]
+    result = runner(args)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.command == "compare" and result["regressions"]:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
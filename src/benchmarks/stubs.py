@@ -0,0 +1,58 @@
+"""Offline stand-ins for external services used by the benchmarks"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from benchmarks.corpus import PLACES
+
+class _MapboxHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        query = unquote(self.path.split("?", 1)[0].rsplit("/", 1)[-1]).removesuffix(".json").lower()
+        features = []
+        for name, (lat, lng) in PLACES.items():
+            if name.lower() in query:
+                features.append({"geometry": {"type": "Point", "coordinates": [lng, lat]}, "place_name": name})
+                break
+
+        body = json.dumps({"type": "FeatureCollection", "features": features}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubMapboxServer:
+    """Local HTTP server answering Mapbox forward-geocoding requests from corpus.PLACES"""
+
+    def __init__(self, latency_ms=20.0, port=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _MapboxHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency_ms / 1000.0
+        self.httpd.requests = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="stub-mapbox", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
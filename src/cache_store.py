@@ -0,0 +1,188 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by cache lookups that found nothing (None is a valid cached value)
+MISSING = object()
+
+
+class TTLLRUCache:
+    """Thread-safe in-process LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max(1, int(max_size))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Counted under the lock, so callers on many threads need no locking of their own
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_with_expiry(self, key):
+        """Return (value, expires_at), or (MISSING, None) if absent or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.time():
+                self._data.pop(key, None)
+                return MISSING, None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, ttl, expires_at=None):
+        with self._lock:
+            self._data[key] = (value, expires_at if expires_at is not None else time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Hit/miss counts of get()"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+
+
+class SQLiteTTLStore:
+    """Persistent key/value store with expiry, backed by a single SQLite file.
+
+    Values are stored as JSON so anything json-serializable (including None)
+    can be cached.
+    """
+
+    def __init__(self, path, table="cache"):
+        self.path = path
+        self.table = table
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_with_expiry(self, key):
+        """Return (value, expires_at), or (MISSING, None) if absent or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return MISSING, None
+        return json.loads(row[0]), row[1]
+
+    def get(self, key, default=MISSING):
+        value, _ = self.get_with_expiry(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Remove expired rows and return how many were deleted"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+class TwoTierCache:
+    """In-process LRU in front of an optional persistent store, with hit/miss counters"""
+
+    def __init__(self, memory, store=None):
+        self.memory = memory
+        self.store = store
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value, _ = self.memory.get_with_expiry(key)
+        if value is not MISSING:
+            self._count("memory_hits")
+            return value
+
+        if self.store is not None:
+            try:
+                value, expires_at = self.store.get_with_expiry(key)
+            except sqlite3.Error as e:
+                print(f"Cache store error: {e}")
+                value = MISSING
+            if value is not MISSING:
+                # Promote to memory, keeping the original expiry
+                self.memory.set(key, value, ttl=0, expires_at=expires_at)
+                self._count("store_hits")
+                return value
+
+        self._count("misses")
+        return MISSING
+
+    def set(self, key, value, ttl):
+        self.memory.set(key, value, ttl)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, ttl)
+            except sqlite3.Error as e:
+                print(f"Cache store error: {e}")
+
+    def clear(self):
+        self.memory.clear()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        hits = self.memory_hits + self.store_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
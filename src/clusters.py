@@ -0,0 +1,150 @@
+"""Pre-aggregated map clusters and heatmap grids.
+
+Verified, non-duplicate reports are counted per geohash cell at each of
+CLUSTER_PRECISIONS, so zoomed-out map views read a few hundred aggregate rows
+instead of every report. A zoom level maps to the precision whose cells are
+roughly a quarter of a map tile wide.
+"""
+from collections import Counter
+from sqlalchemy import and_, or_
+from extensions import db
+from models import CrimeReport, ClusterCell
+from counters import increment_counts
+from persistence import VERIFIED_THRESHOLD, register_transaction_hook
+import geohash
+
+CLUSTER_PRECISIONS = (2, 3, 4, 5, 6)
+# Upper bound on prefix ranges used to cover a query box
+MAX_QUERY_CELLS = 32
+MAX_ZOOM = 22
+
+def precision_for_zoom(zoom):
+    """Coarsest stored precision whose cells are at most 1/4 of a tile wide at `zoom`"""
+    zoom = max(0, min(int(zoom), MAX_ZOOM))
+    tile_lng = 360.0 / (1 << zoom)
+    for precision in CLUSTER_PRECISIONS:
+        if geohash.cell_size(precision)[1] <= tile_lng / 4:
+            return precision
+    return CLUSTER_PRECISIONS[-1]
+
+def _increments(reports):
+    """Counter increments for an iterable of (category, latitude, longitude, geohash, trust_score, canonical_id)"""
+    increments = {}
+    for category, latitude, longitude, cell, trust_score, canonical_id in reports:
+        if trust_score is None or trust_score <= VERIFIED_THRESHOLD or canonical_id is not None:
+            continue
+        if latitude is None or longitude is None:
+            continue
+        cell = cell or geohash.encode(latitude, longitude)
+        category = category or "Unknown"
+        for precision in CLUSTER_PRECISIONS:
+            amounts = increments.setdefault((precision, cell[:precision], category),
+                                            {"count": 0, "lat_sum": 0.0, "lng_sum": 0.0})
+            amounts["count"] += 1
+            amounts["lat_sum"] += latitude
+            amounts["lng_sum"] += longitude
+    return increments
+
+@register_transaction_hook
+def record_reports(rows):
+    """Update the cluster cells for newly inserted report rows (same transaction)"""
+    increment_counts(
+        ClusterCell, ("precision", "cell", "category"),
+        _increments((row["category"], row["latitude"], row["longitude"], row.get("geohash"),
+                     row["trust_score"], row.get("canonical_id")) for row in rows)
+    )
+
+def _cells_in_bbox(precision, bbox, category=None):
+    """ClusterCell rows of `precision` whose cell intersects bbox (min_lat, min_lng, max_lat, max_lng)"""
+    query = db.session.query(ClusterCell).filter(ClusterCell.precision == precision)
+    if bbox is not None:
+        cells = geohash.cover_bbox(*bbox, max_cells=MAX_QUERY_CELLS, max_precision=precision)
+        if cells and cells != [""]:
+            query = query.filter(or_(*[
+                and_(ClusterCell.cell >= lo, ClusterCell.cell < hi)
+                for lo, hi in (geohash.prefix_range(cell) for cell in cells)
+            ]))
+    if category:
+        query = query.filter(ClusterCell.category == category)
+    return query
+
+def _intersects(cell, bbox):
+    min_lat, min_lng, max_lat, max_lng = geohash.decode_bbox(cell)
+    return not (max_lat < bbox[0] or min_lat > bbox[2] or max_lng < bbox[1] or min_lng > bbox[3])
+
+def clusters(zoom, bbox=None, category=None):
+    """Clusters for a map view: one per cell with its centroid, total and dominant category"""
+    precision = precision_for_zoom(zoom)
+    grouped = {}
+    for row in _cells_in_bbox(precision, bbox, category):
+        if not row.count:
+            continue
+        cluster = grouped.setdefault(row.cell, {"count": 0, "lat_sum": 0.0, "lng_sum": 0.0, "categories": {}})
+        cluster["count"] += row.count
+        cluster["lat_sum"] += row.lat_sum
+        cluster["lng_sum"] += row.lng_sum
+        cluster["categories"][row.category] = row.count
+
+    results = []
+    for cell, cluster in grouped.items():
+        if bbox is not None and not _intersects(cell, bbox):
+            continue
+        categories = cluster["categories"]
+        results.append({
+            "geohash": cell,
+            "latitude": cluster["lat_sum"] / cluster["count"],
+            "longitude": cluster["lng_sum"] / cluster["count"],
+            "count": cluster["count"],
+            "dominant_category": max(categories, key=lambda name: (categories[name], name)),
+            "categories": categories,
+            "bounds": geohash.decode_bbox(cell)
+        })
+    results.sort(key=lambda cluster: cluster["count"], reverse=True)
+    return {"zoom": zoom, "precision": precision, "clusters": results}
+
+def heatmap(zoom, bbox=None, category=None):
+    """Grid of cell centres with counts and a 0-1 intensity, for a heat layer"""
+    precision = precision_for_zoom(zoom)
+    counts = Counter()
+    for row in _cells_in_bbox(precision, bbox, category):
+        counts[row.cell] += row.count
+
+    if bbox is not None:
+        counts = Counter({cell: n for cell, n in counts.items() if _intersects(cell, bbox)})
+    peak = max(counts.values(), default=0)
+    lat_step, lng_step = geohash.cell_size(precision)
+    cells = []
+    for cell, count in sorted(counts.items()):
+        if not count:
+            continue
+        latitude, longitude = geohash.decode(cell)
+        cells.append({
+            "geohash": cell,
+            "latitude": latitude,
+            "longitude": longitude,
+            "count": count,
+            "intensity": round(count / peak, 4)
+        })
+    return {
+        "zoom": zoom,
+        "precision": precision,
+        "cell_size": {"lat": lat_step, "lng": lng_step},
+        "max_count": peak,
+        "cells": cells
+    }
+
+def rebuild_clusters(batch_size=5000):
+    """Recompute every cluster cell from the crime_reports table"""
+    db.session.query(ClusterCell).delete()
+    rows = db.session.query(
+        CrimeReport.category, CrimeReport.latitude, CrimeReport.longitude, CrimeReport.geohash,
+        CrimeReport.trust_score, CrimeReport.canonical_id
+    ).filter(
+        CrimeReport.trust_score > VERIFIED_THRESHOLD,
+        CrimeReport.canonical_id.is_(None)
+    ).yield_per(batch_size)
+    increments = _increments(rows)
+    increment_counts(ClusterCell, ("precision", "cell", "category"), increments)
+    db.session.commit()
+    coarsest = CLUSTER_PRECISIONS[0]
+    return sum(amounts["count"] for (precision, _, _), amounts in increments.items() if precision == coarsest)
@@ -0,0 +1,151 @@
+"""Corroboration of new reports by nearby recent ones.
+
+Stored, non-duplicate reports are kept in memory for CORROBORATION_WINDOW_MINUTES,
+bucketed by geohash cell in bounded ring buffers (deques). A new report is
+corroborated by earlier reports of the same category within
+CORROBORATION_RADIUS_KM; each one raises its trust score by
+CORROBORATION_BOOST times the corroborating report's own trust, up to
+CORROBORATION_MAX_BOOST in total. Lookups scan only the few cells covering
+the radius, so they take microseconds and make no network call.
+
+A commit hook indexes reports as they are saved; rebuild() reloads the window
+from the database at startup. Reports stored at the default location (no
+location found) are never indexed, since they all share one point.
+
+The boost depends on what was stored recently, so apply_corroboration runs on
+every pipeline result after the pipeline cache, never inside it.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from extensions import db
+from models import CrimeReport
+from persistence import STORE_THRESHOLD, register_commit_hook
+import geohash
+
+CORROBORATION_RADIUS_KM = float(os.getenv("CORROBORATION_RADIUS_KM", "1.0"))
+CORROBORATION_WINDOW_MINUTES = float(os.getenv("CORROBORATION_WINDOW_MINUTES", "120"))
+CORROBORATION_BOOST = float(os.getenv("CORROBORATION_BOOST", "0.05"))
+CORROBORATION_MAX_BOOST = float(os.getenv("CORROBORATION_MAX_BOOST", "0.15"))
+# Cells of ~1.2 x 0.6 km; a 1 km radius is covered by about a dozen of them
+CORROBORATION_PRECISION = int(os.getenv("CORROBORATION_PRECISION", "6"))
+# Newest reports kept per cell
+CORROBORATION_CELL_CAPACITY = int(os.getenv("CORROBORATION_CELL_CAPACITY", "64"))
+
+def _category_key(category):
+    return (category or "unknown").strip().lower()
+
+class CorroborationIndex:
+    """Recent reports per geohash cell, newest last"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, radius_km=CORROBORATION_RADIUS_KM, window_minutes=CORROBORATION_WINDOW_MINUTES,
+                 precision=CORROBORATION_PRECISION, cell_capacity=CORROBORATION_CELL_CAPACITY):
+        self.radius_km = radius_km
+        self.window = window_minutes * 60
+        self.precision = precision
+        self.cell_capacity = cell_capacity
+        self._cells = {}  # geohash -> deque of (epoch seconds, lat, lng, category key, trust, id)
+        self._lock = threading.Lock()
+        self._adds = 0
+        self.counters = {"indexed": 0, "lookups": 0, "corroborated": 0}
+
+    def add(self, report_id, latitude, longitude, category, trust_score, timestamp):
+        """Index one stored report; `timestamp` is a naive UTC datetime or epoch seconds"""
+        if isinstance(timestamp, datetime):
+            timestamp = (timestamp - datetime(1970, 1, 1)).total_seconds()
+        cell = geohash.encode(latitude, longitude, self.precision)
+        entry = (timestamp, latitude, longitude, _category_key(category), trust_score, report_id)
+        with self._lock:
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                bucket = self._cells[cell] = deque(maxlen=self.cell_capacity)
+            bucket.append(entry)
+            self.counters["indexed"] += 1
+            self._adds += 1
+            if self._adds % self.PRUNE_EVERY == 0:
+                self._prune(time.time() - self.window)
+
+    def _prune(self, cutoff):
+        """Drop cells whose newest report has left the window (caller holds the lock)"""
+        for cell in [cell for cell, bucket in self._cells.items() if bucket[-1][0] < cutoff]:
+            del self._cells[cell]
+
+    def nearby(self, latitude, longitude, category, now=None, exclude_id=None):
+        """Reports of `category` within the radius and time window, newest first per cell"""
+        cutoff = (now or time.time()) - self.window
+        key = _category_key(category)
+        cells = geohash.covering_cells(*geohash.radius_bbox(latitude, longitude, self.radius_km), self.precision)
+        matches = []
+        with self._lock:
+            self.counters["lookups"] += 1
+            for cell in cells:
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                for entry in reversed(bucket):
+                    if entry[0] < cutoff:
+                        break
+                    if (entry[3] == key and entry[5] != exclude_id
+                            and geohash.haversine_km(latitude, longitude, entry[1], entry[2]) <= self.radius_km):
+                        matches.append(entry)
+            if matches:
+                self.counters["corroborated"] += 1
+        return matches
+
+    def rebuild(self, now=None):
+        """Reload the window from the database (needs an app context); returns the number indexed"""
+        now = now or datetime.utcnow()
+        rows = db.session.query(
+            CrimeReport.id, CrimeReport.latitude, CrimeReport.longitude, CrimeReport.category,
+            CrimeReport.trust_score, CrimeReport.timestamp
+        ).filter(
+            CrimeReport.timestamp >= now - timedelta(seconds=self.window),
+            CrimeReport.trust_score > STORE_THRESHOLD,
+            CrimeReport.canonical_id.is_(None),
+            CrimeReport.location_source.is_distinct_from('default'),
+            CrimeReport.latitude.isnot(None),
+            CrimeReport.longitude.isnot(None)
+        ).order_by(CrimeReport.timestamp).all()
+        with self._lock:
+            self._cells = {}
+        for row in rows:
+            self.add(row.id, row.latitude, row.longitude, row.category, row.trust_score, row.timestamp)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, cells=len(self._cells), reports=sum(len(b) for b in self._cells.values()))
+
+corroboration_index = CorroborationIndex()
+
+@register_commit_hook
+def index_saved_reports(rows):
+    """Make newly saved reports available to corroborate later ones"""
+    for row in rows:
+        if (row.get('canonical_id') or row.get('location_source') == 'default'
+                or row['latitude'] is None or row['longitude'] is None):
+            continue
+        corroboration_index.add(row['id'], row['latitude'], row['longitude'], row['category'],
+                                row['trust_score'], row['timestamp'])
+
+def corroborated_trust(trust_score, location, category):
+    """(adjusted trust score, number of corroborating reports) for a report at `location`"""
+    matches = corroboration_index.nearby(location[0], location[1], category)
+    if not matches:
+        return trust_score, 0
+    boost = min(CORROBORATION_MAX_BOOST, CORROBORATION_BOOST * sum(entry[4] for entry in matches))
+    return min(1.0, trust_score + boost), len(matches)
+
+def apply_corroboration(result):
+    """A pipeline result with its trust score raised by nearby recent reports"""
+    if result.get('location_source') == 'default':
+        return result
+    trust_score, corroborating = corroborated_trust(result['trust_score'], result['gps_location'], result['alert_type'])
+    if not corroborating:
+        return result
+    print(f"✅ Corroborated by {corroborating} nearby report(s) (trust: {trust_score:.2f})")
+    return dict(result, trust_score=trust_score)
@@ -0,0 +1,49 @@
+from sqlalchemy import insert
+from extensions import db
+
+def _dialect_insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table)
+
+def increment_counts(model, key_columns, increments):
+    """Add to counter columns of `model`, creating rows as needed.
+
+    `increments` maps a tuple of key values (in `key_columns` order) to a dict
+    of {counter_column: amount}. Runs in the current session transaction and
+    does not commit, so counters move atomically with the rows they count.
+    """
+    if not increments:
+        return
+
+    rows = [
+        dict(zip(key_columns, key), **amounts) for key, amounts in increments.items()
+    ]
+    counter_columns = sorted({column for amounts in increments.values() for column in amounts})
+
+    table = model.__table__
+    stmt = _dialect_insert(table)
+    if stmt is not None:
+        # Native upsert: INSERT ... ON CONFLICT DO UPDATE SET c = c + excluded.c
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: table.c[column] + stmt.excluded[column] for column in counter_columns}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    # Portable fallback for other databases
+    for key, amounts in increments.items():
+        condition = [table.c[column] == value for column, value in zip(key_columns, key)]
+        result = db.session.execute(
+            table.update().where(*condition).values(
+                {column: table.c[column] + amount for column, amount in amounts.items()}
+            )
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(table), [dict(zip(key_columns, key), **amounts)])
@@ -0,0 +1,184 @@
+"""Duplicate and near-duplicate report detection.
+
+Exact duplicates are found by a hash of the normalized text; near-duplicates
+(trivial edits) by a 64-bit SimHash whose Hamming distance to a known report
+is at most NEAR_DUPLICATE_DISTANCE. The SimHash index splits each hash into
+four 16-bit bands, so any hash within distance 3 shares at least one band with
+its match and only those candidates are compared.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from cache_store import MISSING, TTLLRUCache, SQLiteTTLStore, TwoTierCache
+
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", str(24 * 3600)))
+# Optional persistent tier for classification verdicts (empty = memory only)
+CLASSIFICATION_CACHE_PATH = os.getenv("CLASSIFICATION_CACHE_PATH", "")
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "3"))
+DEDUP_INDEX_SIZE = int(os.getenv("DEDUP_INDEX_SIZE", "50000"))
+
+_BANDS = 4
+_BAND_BITS = 16
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+def normalize_report_text(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+def content_hash(text):
+    """Stable hash of the normalized report text"""
+    return hashlib.sha256(normalize_report_text(text).encode("utf-8")).hexdigest()
+
+def _features(normalized):
+    words = normalized.split()
+    if len(words) < 2:
+        return words
+    return [" ".join(words[i:i + 2]) for i in range(len(words) - 1)]
+
+def simhash(text):
+    """64-bit SimHash over word bigrams of the normalized text"""
+    weights = [0] * 64
+    for feature in _features(normalize_report_text(text)):
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+class DuplicateIndex:
+    """Bounded in-memory index of known reports by content hash and SimHash.
+
+    Each entry holds the classification verdict and, once saved, the report id
+    and the canonical report it links to.
+    """
+
+    def __init__(self, max_entries=DEDUP_INDEX_SIZE, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # content hash -> entry dict
+        self._bands = [dict() for _ in range(_BANDS)]  # band value -> set of content hashes
+        self._lock = threading.Lock()
+
+    def _band_keys(self, value):
+        return [(value >> (band * _BAND_BITS)) & _BAND_MASK for band in range(_BANDS)]
+
+    def add(self, key, fingerprint, **fields):
+        """Add or update the entry for a content hash"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"simhash": fingerprint, "verdict": None, "report_id": None, "canonical_id": None}
+                self._entries[key] = entry
+                for band, band_key in enumerate(self._band_keys(fingerprint)):
+                    self._bands[band].setdefault(band_key, set()).add(key)
+                self._evict()
+            entry.update({name: value for name, value in fields.items() if value is not None})
+            self._entries.move_to_end(key)
+            return entry
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            key, entry = self._entries.popitem(last=False)
+            for band, band_key in enumerate(self._band_keys(entry["simhash"])):
+                members = self._bands[band].get(band_key)
+                if members:
+                    members.discard(key)
+                    if not members:
+                        del self._bands[band][band_key]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def nearest(self, fingerprint, require=None):
+        """Closest entry within max_distance (optionally one that has field `require` set)"""
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(self._band_keys(fingerprint)):
+                candidates |= self._bands[band].get(band_key, set())
+            best, best_distance = None, self.max_distance + 1
+            for key in candidates:
+                entry = self._entries[key]
+                if require and entry.get(require) is None:
+                    continue
+                distance = hamming_distance(fingerprint, entry["simhash"])
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+            return dict(best) if best else None
+
+    def __len__(self):
+        return len(self._entries)
+
+class ReportDeduplicator:
+    """Classification cache plus duplicate linking, with hit-rate counters"""
+
+    def __init__(self, index=None, cache=None):
+        self.index = index or DuplicateIndex()
+        self.cache = cache or _build_classification_cache()
+        self._lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def classify(self, text, classify_fn):
+        """Return classify_fn(text), reusing verdicts of identical or near-identical reports"""
+        key = content_hash(text)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            self._count("exact_hits")
+            return dict(cached, original_text=text)
+
+        fingerprint = simhash(text)
+        near = self.index.nearest(fingerprint, require="verdict")
+        if near is not None:
+            self._count("near_hits")
+            verdict = near["verdict"]
+        else:
+            self._count("misses")
+            result = classify_fn(text)
+            verdict = {k: v for k, v in result.items() if k != "original_text"}
+
+        self.cache.set(key, verdict, CLASSIFICATION_CACHE_TTL)
+        self.index.add(key, fingerprint, verdict=verdict)
+        return dict(verdict, original_text=text)
+
+    def find_canonical(self, text):
+        """Id of the saved report this text duplicates (exactly or nearly), or None"""
+        key = content_hash(text)
+        entry = self.index.get(key)
+        if entry is None or entry["report_id"] is None:
+            entry = self.index.nearest(simhash(text), require="report_id")
+        if entry is None:
+            return None
+        return entry["canonical_id"] or entry["report_id"]
+
+    def remember_report(self, text, report_id, canonical_id=None):
+        """Record a saved report so later copies link to it"""
+        self.index.add(content_hash(text), simhash(text), report_id=report_id, canonical_id=canonical_id)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        hits = counters["exact_hits"] + counters["near_hits"]
+        return dict(counters, hit_rate=hits / lookups if lookups else 0.0,
+                    indexed_reports=len(self.index), cache=self.cache.stats())
+
+def _build_classification_cache():
+    store = None
+    if CLASSIFICATION_CACHE_PATH:
+        try:
+            store = SQLiteTTLStore(CLASSIFICATION_CACHE_PATH, table="classification_cache")
+        except Exception as e:
+            print(f"⚠️ Persistent classification cache unavailable, using memory only: {e}")
+    return TwoTierCache(TTLLRUCache(CLASSIFICATION_CACHE_SIZE), store)
+
+deduplicator = ReportDeduplicator()
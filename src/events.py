@@ -0,0 +1,110 @@
+import itertools
+import json
+import os
+import queue
+import threading
+from collections import deque
+from persistence import VERIFIED_THRESHOLD, register_commit_hook, report_summary
+
+# How many past events are kept for Last-Event-ID resume
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "1000"))
+# Events buffered per client before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", "256"))
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id, event_type, data):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_sse(self):
+        """Format as a server-sent event frame"""
+        frame = f"event: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+        return f"id: {self.id}\n{frame}" if self.id is not None else frame
+
+# Tells a client its view is stale (missed events) and it should refetch /api/reports
+RESYNC = Event(None, "resync", {})
+
+class Subscription:
+    """One connected client: a bounded queue of pending events"""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """Next event, RESYNC once a client that fell behind has drained, or None on timeout"""
+        try:
+            if self.overflowed:
+                return self.queue.get_nowait()
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return RESYNC if self.overflowed else None
+
+class EventBroker:
+    """In-process pub/sub with a replay buffer.
+
+    Publishing never blocks: a subscriber whose queue is full is marked as
+    overflowed and dropped from the fan-out, and gets a RESYNC event instead
+    of an ever-growing backlog.
+    """
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE, subscriber_queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.subscriber_queue_size = subscriber_queue_size
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = Event(next(self._ids), event_type, data)
+            self._history.append(event)
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(event)
+                except queue.Full:
+                    subscription.overflowed = True
+                    self._subscribers.discard(subscription)
+        return event.id
+
+    def subscribe(self, last_event_id=None):
+        """Register a client, replaying anything it missed since last_event_id"""
+        subscription = Subscription(self.subscriber_queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                missed = [event for event in self._history if event.id > last_event_id]
+                oldest = self._history[0].id if self._history else None
+                if oldest is not None and last_event_id < oldest - 1:
+                    # Some events are no longer in the buffer
+                    subscription.overflowed = True
+                elif last_event_id >= (self._history[-1].id if self._history else 0) + 1:
+                    # The id is from before a restart
+                    subscription.overflowed = True
+                elif len(missed) > self.subscriber_queue_size:
+                    subscription.overflowed = True
+                else:
+                    for event in missed:
+                        subscription.queue.put_nowait(event)
+            if not subscription.overflowed:
+                self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+broker = EventBroker()
+
+@register_commit_hook
+def publish_reports(rows):
+    """Push newly committed verified reports to live dashboards"""
+    for row in rows:
+        # Duplicates of an already-shown report do not get their own marker
+        if row['trust_score'] > VERIFIED_THRESHOLD and not row.get('canonical_id'):
+            broker.publish("report", report_summary(row))
@@ -0,0 +1,174 @@
+"""Streaming export of crime reports as CSV, NDJSON or Parquet.
+
+Rows are read in EXPORT_CHUNK_SIZE chunks through a streaming cursor
+(server-side on PostgreSQL) and written out chunk by chunk, so memory use
+does not grow with the table. The 'text' and 'label' columns match what
+Ml_classifier.ipynb reads from main_crime_alert.csv, so an export can be fed
+straight back into training.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from sqlalchemy import select
+from extensions import db
+from models import CrimeReport
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (output name, column)
+EXPORT_COLUMNS = (
+    ("id", CrimeReport.id),
+    ("text", CrimeReport.original_text),
+    ("label", CrimeReport.predicted_label),
+    ("confidence", CrimeReport.confidence),
+    ("trust_score", CrimeReport.trust_score),
+    ("category", CrimeReport.category),
+    ("latitude", CrimeReport.latitude),
+    ("longitude", CrimeReport.longitude),
+    ("geohash", CrimeReport.geohash),
+    ("timestamp", CrimeReport.timestamp),
+    ("canonical_id", CrimeReport.canonical_id),
+)
+FIELD_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+
+def parse_export_filters(args):
+    """Export filters from request args (or any mapping with .get/.getlist)"""
+    filters = {"since": None, "until": None, "categories": [], "min_trust": None,
+               "include_duplicates": args.get("include_duplicates") == "1"}
+    if args.get("since"):
+        filters["since"] = _parse_time(args["since"], "since")
+    if args.get("until"):
+        filters["until"] = _parse_time(args["until"], "until")
+    for value in args.getlist("category") if hasattr(args, "getlist") else [args.get("category") or ""]:
+        filters["categories"].extend(part.strip() for part in value.split(",") if part.strip())
+    if args.get("min_trust"):
+        try:
+            filters["min_trust"] = float(args["min_trust"])
+        except ValueError:
+            raise ValueError("min_trust must be a number")
+    return filters
+
+def export_statement(since=None, until=None, categories=(), min_trust=None, include_duplicates=False):
+    """SELECT of the export columns in id order, with the given filters"""
+    stmt = select(*[column.label(name) for name, column in EXPORT_COLUMNS])
+    if since is not None:
+        stmt = stmt.where(CrimeReport.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(CrimeReport.timestamp < until)
+    if categories:
+        stmt = stmt.where(CrimeReport.category.in_(list(categories)))
+    if min_trust is not None:
+        stmt = stmt.where(CrimeReport.trust_score >= min_trust)
+    if not include_duplicates:
+        stmt = stmt.where(CrimeReport.canonical_id.is_(None))
+    return stmt.order_by(CrimeReport.id)
+
+def iter_chunks(stmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of row mappings, `chunk_size` at a time, from a streaming cursor"""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size, stream_results=True))
+    for partition in result.mappings().partitions():
+        yield partition
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def iter_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELD_NAMES)
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows({name: _json_value(row[name]) for name in FIELD_NAMES} for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_ndjson(chunks):
+    for chunk in chunks:
+        yield "".join(
+            json.dumps({name: _json_value(row[name]) for name in FIELD_NAMES}) + "\n" for row in chunk
+        )
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("text", pa.string()),
+        ("label", pa.string()),
+        ("confidence", pa.float64()),
+        ("trust_score", pa.float64()),
+        ("category", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("geohash", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("canonical_id", pa.int64()),
+    ])
+
+def iter_parquet(chunks):
+    """One Parquet row group per chunk, yielded as bytes as soon as it is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            columns = {name: [row[name] for row in chunk] for name in FIELD_NAMES}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def stream_export(fmt, filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """Generator of str (csv/ndjson) or bytes (parquet) pieces of the export"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+    chunks = iter_chunks(export_statement(**filters), chunk_size)
+    return {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet}[fmt](chunks)
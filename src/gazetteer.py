@@ -0,0 +1,160 @@
+"""Offline place extraction from report text.
+
+Place names (and aliases) from a TSV gazetteer are compiled into an
+Aho-Corasick automaton, so every mention in a report is found in a single
+pass over the text, regardless of how many places are known. Matches must
+sit on word boundaries. When several places are mentioned the most specific
+wins: the longest name, then landmark over area over LGA, then the earliest.
+
+Gazetteer rows: name<TAB>latitude<TAB>longitude<TAB>kind[<TAB>alias,alias...]
+Lines starting with '#' are comments.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lagos_gazetteer.tsv")
+)
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "1") == "1"
+
+# Higher is more specific
+KIND_PRIORITY = {"landmark": 3, "area": 2, "lga": 1}
+
+def normalize_place_text(text):
+    """Lowercase and turn anything but letters/digits into single spaces"""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", (text or "").lower()).split())
+
+class Place:
+    __slots__ = ("name", "latitude", "longitude", "kind")
+
+    def __init__(self, name, latitude, longitude, kind):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.kind = kind
+
+    @property
+    def coordinates(self):
+        return (self.latitude, self.longitude)
+
+    def __repr__(self):
+        return f"<Place {self.name} ({self.latitude}, {self.longitude}) {self.kind}>"
+
+class Gazetteer:
+    """Aho-Corasick automaton over normalized place names"""
+    name = "gazetteer"
+
+    def __init__(self, places=()):
+        self.places = []
+        self._goto = [{}]  # node -> {char: node}
+        self._fail = [0]
+        self._out = [[]]  # node -> [(pattern length, place index)]
+        for place, aliases in places:
+            self._add(place, aliases)
+        self._build()
+
+    def _add(self, place, aliases=()):
+        index = len(self.places)
+        self.places.append(place)
+        for pattern in {normalize_place_text(place.name), *(normalize_place_text(a) for a in aliases)}:
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), index))
+
+    def _build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text):
+        """[(start, end, Place)] for every whole-word mention in text"""
+        normalized = normalize_place_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        node = 0
+        for position, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, index in out[node]:
+                start = position - length + 1
+                end = position + 1
+                if (start == 0 or normalized[start - 1] == " ") and (end == len(normalized) or normalized[end] == " "):
+                    matches.append((start, end, self.places[index]))
+        return matches
+
+    def locate(self, text):
+        """The most specific Place mentioned in text, or None"""
+        best, best_key = None, None
+        for start, end, place in self.find_all(text):
+            key = (end - start, KIND_PRIORITY.get(place.kind, 0), -start)
+            if best_key is None or key > best_key:
+                best, best_key = place, key
+        return best
+
+    def geocode(self, location_text):
+        """Provider interface (see geocoding.py): (lat, lon) or None"""
+        place = self.locate(location_text)
+        return place.coordinates if place else None
+
+    def __len__(self):
+        return len(self.places)
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Read a gazetteer TSV and compile it"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            try:
+                name, latitude, longitude, kind = fields[:4]
+                place = Place(name, float(latitude), float(longitude), kind)
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: expected name, latitude, longitude, kind")
+            aliases = [alias.strip() for alias in fields[4].split(",")] if len(fields) > 4 else []
+            entries.append((place, aliases))
+    return Gazetteer(entries)
+
+_gazetteer = None
+_load_lock = threading.Lock()
+
+def get_gazetteer():
+    """The default gazetteer, loaded on first use (None if disabled or unreadable)"""
+    global _gazetteer
+    if _gazetteer is not None or not GAZETTEER_ENABLED:
+        return _gazetteer or None
+    with _load_lock:
+        if _gazetteer is None:
+            started = time.perf_counter()
+            try:
+                _gazetteer = load_gazetteer()
+                print(f"✅ Loaded {len(_gazetteer)} gazetteer places in {1000 * (time.perf_counter() - started):.1f} ms")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Gazetteer unavailable, using the remote geocoder only: {e}")
+                _gazetteer = False
+    return _gazetteer or None
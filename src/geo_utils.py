@@ -1,31 +1,209 @@
 import requests
 import os
+import re
+from cache_store import MISSING, TTLLRUCache, SQLiteTTLStore, TwoTierCache
+from telemetry import span, geocode_requests, geocode_seconds
+from geocoding import GeocoderUnavailable, GeocoderRejected, GeocodingClient
+from gazetteer import get_gazetteer
 
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
+# Overridable so benchmarks can point at a local stub server
+MAPBOX_BASE_URL = os.getenv("MAPBOX_BASE_URL", "https://api.mapbox.com").rstrip("/")
 
-def get_coordinates_from_text(location_text: str):
-    """Extract coordinates from text using Mapbox API"""
+# Geocode cache settings - found places live for a week, misses only briefly
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(7 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", "600"))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "2048"))
+# Set GEOCODE_CACHE_PATH to an empty string to keep the cache in memory only
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "geocode_cache.sqlite3")
+)
+
+# Remote geocoder HTTP settings (shared with the async pipeline's client)
+GEOCODER_TIMEOUT = float(os.getenv("GEOCODER_TIMEOUT", "5"))
+GEOCODER_MAX_CONNECTIONS = int(os.getenv("GEOCODER_MAX_CONNECTIONS", "20"))
+
+def normalize_location_text(location_text: str):
+    """Normalize text into a cache key: lowercase, no punctuation, single spaces"""
+    text = re.sub(r"[^\w\s-]", " ", (location_text or "").lower())
+    return " ".join(text.split())
+
+def _mapbox_request(location_text: str):
+    """URL and query params for a Mapbox forward geocoding request"""
     if not MAPBOX_TOKEN:
-        print("⚠️ MAPBOX_TOKEN not found in environment variables")
-        return None
-    
-    url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{location_text}.json"
+        raise GeocoderUnavailable("MAPBOX_TOKEN not found in environment variables")
+
+    url = f"{MAPBOX_BASE_URL}/geocoding/v5/mapbox.places/{location_text}.json"
     params = {
         "access_token": MAPBOX_TOKEN,
         "limit": 1,
         "types": "poi,place,address"
     }
-    
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if "features" in data and len(data["features"]) > 0:
-            coords = data["features"][0]["geometry"]["coordinates"]
-            return (coords[1], coords[0])  # (lat, lon)
-        
-    except Exception as e:
-        print(f"Geocoding error: {e}")
-    
+    return url, params
+
+def _parse_mapbox_response(data):
+    """Pull (lat, lon) of the best feature out of a Mapbox response, or None"""
+    if "features" in data and len(data["features"]) > 0:
+        coords = data["features"][0]["geometry"]["coordinates"]
+        return (coords[1], coords[0])  # (lat, lon)
+
     return None
+
+class MapboxProvider:
+    """Mapbox forward geocoding over a pooled keep-alive session"""
+    name = "mapbox"
+
+    def __init__(self, timeout=GEOCODER_TIMEOUT, pool_size=GEOCODER_MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def geocode(self, location_text: str):
+        """Look up coordinates with the Mapbox API, returning (lat, lon) or None"""
+        url, params = _mapbox_request(location_text)
+
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            raise GeocoderUnavailable(str(e)) from e
+
+        return _parse_mapbox_response(data)
+
+    async def geocode_async(self, location_text: str, client):
+        """Async Mapbox lookup using a pooled httpx.AsyncClient"""
+        url, params = _mapbox_request(location_text)
+
+        try:
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            raise GeocoderUnavailable(str(e)) from e
+
+        return _parse_mapbox_response(data)
+
+class StubGeocoder:
+    """Offline stand-in for Mapbox: answers from a dict of normalized text -> (lat, lon)"""
+    name = "stub"
+
+    def __init__(self, places=None):
+        self.places = {normalize_location_text(k): tuple(v) for k, v in (places or {}).items()}
+        self.calls = 0
+
+    def __call__(self, location_text: str):
+        self.calls += 1
+        return self.places.get(normalize_location_text(location_text))
+
+    geocode = __call__
+
+geocoder_client = GeocodingClient(MapboxProvider())
+
+# Compile the offline gazetteer at startup (a few milliseconds)
+get_gazetteer()
+
+def set_geocoder(geocoder):
+    """Swap the geocoding provider (e.g. a StubGeocoder in tests) and return the previous one.
+
+    Accepts a provider object (with .geocode) or a plain function.
+    """
+    global geocoder_client
+    previous = geocoder_client.provider
+    geocoder_client = GeocodingClient(geocoder)
+    return previous
+
+def geocoder_metrics():
+    """Coalescing, concurrency and circuit breaker state of the geocoding client"""
+    return geocoder_client.metrics()
+
+def _build_cache():
+    store = None
+    if GEOCODE_CACHE_PATH:
+        try:
+            store = SQLiteTTLStore(GEOCODE_CACHE_PATH, table="geocode_cache")
+        except Exception as e:
+            print(f"⚠️ Persistent geocode cache unavailable, using memory only: {e}")
+    return TwoTierCache(TTLLRUCache(GEOCODE_CACHE_SIZE), store)
+
+geocode_cache = _build_cache()
+
+def geocode_cache_stats():
+    """Hit/miss counters of the geocode cache"""
+    return geocode_cache.stats()
+
+def _cache_result(key, coords):
+    """Store a lookup result (negative results with the short TTL)"""
+    if coords:
+        geocode_cache.set(key, list(coords), GEOCODE_CACHE_TTL)
+        return tuple(coords)
+
+    geocode_cache.set(key, None, GEOCODE_NEGATIVE_TTL)
+    return None
+
+def lookup_gazetteer(location_text: str):
+    """Coordinates of the most specific known place mentioned in the text, or None"""
+    gazetteer = get_gazetteer()
+    coords = gazetteer.geocode(location_text) if gazetteer else None
+    if coords:
+        geocode_requests.inc(outcome="gazetteer")
+    return coords
+
+def get_coordinates_from_text(location_text: str):
+    """Extract coordinates from text: offline gazetteer first, then the geocode cache, then Mapbox"""
+    key = normalize_location_text(location_text)
+    if not key:
+        return None
+
+    coords = lookup_gazetteer(location_text)
+    if coords:
+        return coords
+
+    cached = geocode_cache.get(key)
+    if cached is not MISSING:
+        geocode_requests.inc(outcome="cache_hit")
+        return tuple(cached) if cached else None
+
+    try:
+        with span("geocode", geocode_seconds):
+            coords = geocoder_client.geocode(location_text, key)
+    except GeocoderUnavailable as e:
+        geocode_requests.inc(outcome="rejected" if isinstance(e, GeocoderRejected) else "failure")
+        print(f"⚠️ Geocoding unavailable: {e}")
+        return None
+
+    geocode_requests.inc(outcome="success" if coords else "not_found")
+    return _cache_result(key, coords)
+
+async def get_coordinates_from_text_async(location_text: str, client):
+    """Async variant of get_coordinates_from_text sharing the same cache.
+
+    Mapbox is queried through `client` (an httpx.AsyncClient); providers
+    without an async lookup (such as StubGeocoder) run in a worker thread.
+    """
+    key = normalize_location_text(location_text)
+    if not key:
+        return None
+
+    coords = lookup_gazetteer(location_text)
+    if coords:
+        return coords
+
+    cached = geocode_cache.get(key)
+    if cached is not MISSING:
+        geocode_requests.inc(outcome="cache_hit")
+        return tuple(cached) if cached else None
+
+    try:
+        with span("geocode", geocode_seconds):
+            coords = await geocoder_client.geocode_async(location_text, client, key)
+    except GeocoderUnavailable as e:
+        geocode_requests.inc(outcome="rejected" if isinstance(e, GeocoderRejected) else "failure")
+        print(f"⚠️ Geocoding unavailable: {e}")
+        return None
+
+    geocode_requests.inc(outcome="success" if coords else "not_found")
+    return _cache_result(key, coords)
@@ -0,0 +1,266 @@
+"""Resilient client layer in front of a geocoding provider.
+
+A provider is any object with `name` and `geocode(text) -> (lat, lon) | None`
+(optionally `async geocode_async(text, http_client)`), raising
+GeocoderUnavailable when it cannot answer. GeocodingClient adds:
+
+- coalescing: concurrent lookups of the same text share one provider call
+- a concurrency limit, so a slow provider cannot tie up every request thread
+- a circuit breaker that fails fast once the recent error rate spikes, so the
+  pipeline falls back to GPS/default coordinates instead of waiting on timeouts
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from telemetry import geocoder_breaker_state, geocoder_breaker_transitions
+
+GEOCODER_MAX_CONCURRENCY = int(os.getenv("GEOCODER_MAX_CONCURRENCY", "10"))
+# How long a lookup waits for a free slot before giving up
+GEOCODER_QUEUE_TIMEOUT = float(os.getenv("GEOCODER_QUEUE_TIMEOUT", "1"))
+# Breaker opens when at least BREAKER_MIN_CALLS of the last BREAKER_WINDOW
+# calls were made and BREAKER_FAILURE_RATIO of them failed
+BREAKER_WINDOW = int(os.getenv("GEOCODER_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("GEOCODER_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATIO = float(os.getenv("GEOCODER_BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("GEOCODER_BREAKER_COOLDOWN", "30"))
+
+class GeocoderUnavailable(Exception):
+    """Raised when the geocoder cannot answer (missing token, network error...).
+
+    These failures are not cached, unlike a successful lookup with no result.
+    """
+
+class GeocoderRejected(GeocoderUnavailable):
+    """The client failed fast without calling the provider (breaker open or too busy)"""
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitBreaker:
+    """Rolling-window failure-rate breaker.
+
+    Open: calls are refused until `cooldown` seconds pass. Half-open: a single
+    trial call is let through; its success closes the breaker, its failure
+    re-opens it.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_ratio=BREAKER_FAILURE_RATIO, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.opened_count = 0
+        geocoder_breaker_state.set(0, provider=name)
+
+    def _transition(self, state):
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened_count += 1
+        geocoder_breaker_state.set(_STATE_VALUES[state], provider=self.name)
+        geocoder_breaker_transitions.inc(provider=self.name, state=state)
+        print(f"⚠️ Geocoder circuit breaker for {self.name} is now {state}")
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True if a call may go ahead now"""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def cancel(self):
+        """Give back a call allow() granted that never ran, so a half-open trial is not lost"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN:
+                self._outcomes.clear()
+                self._transition(CLOSED)
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_ratio):
+                self._outcomes.clear()
+                self._transition(OPEN)
+
+    def metrics(self):
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(self._outcomes)
+        return {
+            "state": state,
+            "recent_calls": calls,
+            "recent_failure_ratio": failures / calls if calls else 0.0,
+            "opened_count": self.opened_count,
+        }
+
+class CallableProvider:
+    """Adapts a plain function (e.g. StubGeocoder) to the provider interface"""
+
+    def __init__(self, fn, name=None):
+        self.fn = fn
+        self.name = name or getattr(fn, "name", None) or type(fn).__name__
+
+    def geocode(self, location_text):
+        return self.fn(location_text)
+
+def as_provider(geocoder):
+    return geocoder if hasattr(geocoder, "geocode") else CallableProvider(geocoder)
+
+class GeocodingClient:
+    """Coalescing, concurrency-limited, circuit-broken access to one provider"""
+
+    def __init__(self, provider, max_concurrency=GEOCODER_MAX_CONCURRENCY,
+                 queue_timeout=GEOCODER_QUEUE_TIMEOUT, breaker=None):
+        self.provider = as_provider(provider)
+        self.breaker = breaker or CircuitBreaker(self.provider.name)
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._in_flight = {}  # key -> Future shared by concurrent callers
+        self._async_in_flight = {}  # (loop id, key) -> asyncio.Future
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "coalesced": 0, "rejected_open": 0, "rejected_busy": 0,
+                         "failures": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _reject_if_open(self):
+        if not self.breaker.allow():
+            self._count("rejected_open")
+            raise GeocoderRejected(f"{self.provider.name} circuit breaker is open")
+
+    def _record(self, error):
+        if error is None:
+            self.breaker.record_success()
+        else:
+            self._count("failures")
+            self.breaker.record_failure()
+
+    def _call(self, location_text):
+        # Fail fast on an open breaker before queueing for a slot
+        self._reject_if_open()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.cancel()
+            self._count("rejected_busy")
+            raise GeocoderRejected(f"Too many concurrent {self.provider.name} lookups")
+        try:
+            self._count("calls")
+            try:
+                result = self.provider.geocode(location_text)
+            except GeocoderUnavailable as e:
+                self._record(e)
+                raise
+            except Exception as e:
+                self._record(e)
+                raise GeocoderUnavailable(str(e)) from e
+            self._record(None)
+            return result
+        finally:
+            self._slots.release()
+
+    def geocode(self, location_text, key=None):
+        """(lat, lon) or None; raises GeocoderUnavailable on failure or when failing fast"""
+        key = key or location_text
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._call(location_text)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def _call_async(self, location_text, http_client):
+        self._reject_if_open()
+        self._count("calls")
+        try:
+            if hasattr(self.provider, "geocode_async"):
+                result = await self.provider.geocode_async(location_text, http_client)
+            else:
+                result = await asyncio.to_thread(self.provider.geocode, location_text)
+        except GeocoderUnavailable as e:
+            self._record(e)
+            raise
+        except Exception as e:
+            self._record(e)
+            raise GeocoderUnavailable(str(e)) from e
+        self._record(None)
+        return result
+
+    async def geocode_async(self, location_text, http_client, key=None):
+        """Async variant; the concurrency limit is left to http_client's connection pool"""
+        flight_key = (id(asyncio.get_running_loop()), key or location_text)
+        future = self._async_in_flight.get(flight_key)
+        if future is not None:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+
+        future = self._async_in_flight[flight_key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._call_async(location_text, http_client)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a lookup nobody else waited on does not warn
+            future.exception()
+            raise
+        finally:
+            self._async_in_flight.pop(flight_key, None)
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._in_flight) + len(self._async_in_flight)
+        return dict(counters, provider=self.provider.name, in_flight=in_flight, breaker=self.breaker.metrics())
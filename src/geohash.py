@@ -0,0 +1,135 @@
+"""Pure-Python geohash encoding and cell covering helpers.
+
+Geohashes are prefix-ordered strings, so every cell of a given prefix is a
+contiguous range in a plain B-tree index - which lets SQLite prune spatial
+queries without any extension.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+
+# Precision stored on each report (~153m x 153m cells; precision 6 is ~1.2km x 0.6km)
+DEFAULT_PRECISION = 7
+EARTH_RADIUS_KM = 6371.0088
+
+def encode(latitude, longitude, precision=DEFAULT_PRECISION):
+    """Encode a point as a geohash string of the given length"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+def decode_bbox(geohash):
+    """Return (min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lng_lo, lat_hi, lng_hi
+
+def decode(geohash):
+    """Return the (lat, lng) centre of a geohash cell"""
+    min_lat, min_lng, max_lat, max_lng = decode_bbox(geohash)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+def cell_size(precision):
+    """Return (lat_degrees, lng_degrees) spanned by a cell of this precision"""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, precision):
+    """All geohash cells of `precision` that intersect the bounding box"""
+    lat_step, lng_step = cell_size(precision)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lng, max_lng = max(min_lng, -180.0), min(max_lng, 180.0)
+    cells = set()
+    lat_start = math.floor((min_lat + 90.0) / lat_step)
+    lat_end = math.floor((max_lat + 90.0) / lat_step)
+    lng_start = math.floor((min_lng + 180.0) / lng_step)
+    lng_end = math.floor((max_lng + 180.0) / lng_step)
+    for i in range(lat_start, lat_end + 1):
+        lat = min(-90.0 + (i + 0.5) * lat_step, 90.0)
+        for j in range(lng_start, lng_end + 1):
+            lng = min(-180.0 + (j + 0.5) * lng_step, 180.0)
+            cells.add(encode(lat, lng, precision))
+    return sorted(cells)
+
+def cover_bbox(min_lat, min_lng, max_lat, max_lng, max_cells=32, max_precision=DEFAULT_PRECISION):
+    """Pick the finest precision whose covering stays within `max_cells` cells"""
+    best = [""]
+    for precision in range(1, max_precision + 1):
+        lat_step, lng_step = cell_size(precision)
+        estimate = ((max_lat - min_lat) / lat_step + 2) * ((max_lng - min_lng) / lng_step + 2)
+        if estimate > max_cells * 4:
+            break
+        cells = covering_cells(min_lat, min_lng, max_lat, max_lng, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return best
+
+def prefix_range(prefix):
+    """Half-open string range [lo, hi) covering every geohash starting with `prefix`"""
+    # '~' sorts after every base32 character
+    return prefix, prefix + "~"
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) enclosing a circle"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-9 else min(180.0, lat_delta / cos_lat)
+    return (latitude - lat_delta, longitude - lng_delta,
+            latitude + lat_delta, longitude + lng_delta)
@@ -0,0 +1,309 @@
+"""Emerging hotspot detection over recent verified reports.
+
+Verified, non-duplicate reports are counted per geohash cell (HOTSPOT_PRECISION)
+and time bucket (HOTSPOT_BUCKET_MINUTES) in NumPy ring buffers, one for all
+categories and one per category. A commit hook adds new reports as they are
+saved; the buffers are rebuilt from the database on first use.
+
+A cell is a hotspot when its count over the last HOTSPOT_RECENT_BUCKETS
+buckets is well above what its rate over the preceding
+HOTSPOT_BASELINE_BUCKETS predicts. The score is a Poisson z-score,
+(recent - expected) / sqrt(expected + 1), computed for every cell at once.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import BigInteger, Integer, cast, func, select
+from extensions import db
+from models import CrimeReport
+from persistence import VERIFIED_THRESHOLD, register_commit_hook
+import geohash
+
+HOTSPOT_PRECISION = int(os.getenv("HOTSPOT_PRECISION", "6"))
+HOTSPOT_BUCKET_MINUTES = int(os.getenv("HOTSPOT_BUCKET_MINUTES", "60"))
+HOTSPOT_RECENT_BUCKETS = int(os.getenv("HOTSPOT_RECENT_BUCKETS", "3"))
+HOTSPOT_BASELINE_BUCKETS = int(os.getenv("HOTSPOT_BASELINE_BUCKETS", "168"))
+HOTSPOT_MIN_COUNT = int(os.getenv("HOTSPOT_MIN_COUNT", "3"))
+HOTSPOT_Z_THRESHOLD = float(os.getenv("HOTSPOT_Z_THRESHOLD", "3.0"))
+HOTSPOT_REBUILD_CHUNK = 50000
+
+def to_buckets(timestamps, bucket_seconds):
+    """Absolute bucket numbers for naive UTC datetimes (vectorized)"""
+    seconds = np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+    return seconds // bucket_seconds
+
+def epoch_seconds(column, dialect):
+    """SQL expression for a naive UTC timestamp column as integer Unix seconds, or None"""
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    if dialect == "postgresql":
+        return cast(func.extract("epoch", column), BigInteger)
+    return None
+
+def poisson_scores(recent, baseline, recent_buckets, baseline_buckets):
+    """(z-scores, expected recent counts) for arrays of recent and baseline counts"""
+    expected = baseline * (recent_buckets / baseline_buckets)
+    return (recent - expected) / np.sqrt(expected + 1.0), expected
+
+class HotspotGrid:
+    """Report counts per cell over a ring buffer of time buckets"""
+
+    def __init__(self, n_buckets, capacity=64):
+        self.n_buckets = n_buckets
+        self.rows = {}  # cell -> row index
+        self.cells = []
+        self.counts = np.zeros((capacity, n_buckets), dtype=np.int32)
+        self.head = None  # absolute number of the newest bucket
+
+    def _row(self, cell):
+        row = self.rows.get(cell)
+        if row is None:
+            row = self.rows[cell] = len(self.cells)
+            self.cells.append(cell)
+            if row >= len(self.counts):
+                grown = np.zeros((2 * len(self.counts), self.n_buckets), dtype=np.int32)
+                grown[:len(self.counts)] = self.counts
+                self.counts = grown
+        return row
+
+    def advance(self, bucket):
+        """Move the newest bucket forward to `bucket`, clearing the slots that wrap around"""
+        if self.head is None:
+            self.head = bucket
+            return
+        steps = bucket - self.head
+        if steps <= 0:
+            return
+        if steps >= self.n_buckets:
+            self.counts[:] = 0
+        else:
+            self.counts[:, (self.head + 1 + np.arange(steps)) % self.n_buckets] = 0
+        self.head = bucket
+
+    def add_many(self, names, codes, buckets):
+        """Count reports given as indexes `codes` into `names`, with absolute `buckets`"""
+        if len(codes) == 0:
+            return
+        self.advance(int(buckets.max()))
+        keep = buckets > self.head - self.n_buckets
+        codes, buckets = codes[keep], buckets[keep]
+        used = np.unique(codes)
+        row_of_code = np.zeros(len(names), dtype=np.int64)
+        row_of_code[used] = [self._row(str(names[code])) for code in used]
+        flat = row_of_code[codes] * self.n_buckets + buckets % self.n_buckets
+        size = len(self.cells) * self.n_buckets
+        self.counts[:len(self.cells)] += np.bincount(flat, minlength=size).reshape(-1, self.n_buckets).astype(np.int32)
+
+    def window_counts(self, recent_buckets):
+        """(recent, baseline) count per cell: the newest `recent_buckets` slots, and the rest"""
+        counts = self.counts[:len(self.cells)]
+        recent_slots = (self.head - np.arange(recent_buckets)) % self.n_buckets
+        recent = counts[:, recent_slots].sum(axis=1)
+        return recent, counts.sum(axis=1) - recent
+
+class HotspotEngine:
+    """Incrementally maintained hotspot grids for all categories and each category"""
+
+    def __init__(self, precision=HOTSPOT_PRECISION, bucket_minutes=HOTSPOT_BUCKET_MINUTES,
+                 recent_buckets=HOTSPOT_RECENT_BUCKETS, baseline_buckets=HOTSPOT_BASELINE_BUCKETS):
+        self.precision = precision
+        self.bucket_seconds = bucket_minutes * 60
+        self.recent_buckets = recent_buckets
+        self.baseline_buckets = baseline_buckets
+        self.grids = {}  # category (None = all) -> HotspotGrid
+        self.ready = False
+        self.building = False
+        self.loaded_through_id = 0
+        self._pending = []  # rows committed while (re)building
+        self._lock = threading.Lock()
+        self._build_lock = threading.RLock()
+
+    @property
+    def n_buckets(self):
+        return self.recent_buckets + self.baseline_buckets
+
+    def _grid(self, grids, category):
+        grid = grids.get(category)
+        if grid is None:
+            grid = grids[category] = HotspotGrid(self.n_buckets)
+        return grid
+
+    def _add(self, grids, cells, categories, buckets):
+        """Count parallel arrays of cells, categories and buckets into `grids`"""
+        names, codes = np.unique(cells, return_inverse=True)
+        self._grid(grids, None).add_many(names, codes, buckets)
+        category_names, category_codes = np.unique(categories, return_inverse=True)
+        for index, category in enumerate(category_names):
+            mask = category_codes == index
+            self._grid(grids, str(category)).add_many(names, codes[mask], buckets[mask])
+
+    def _columns(self, rows):
+        """Arrays of cells, categories and buckets for report rows, skipping ones not shown on the map"""
+        cells, categories, timestamps = [], [], []
+        for row in rows:
+            if row['trust_score'] is None or row['trust_score'] <= VERIFIED_THRESHOLD or row.get('canonical_id'):
+                continue
+            if row['latitude'] is None or row['longitude'] is None or row['timestamp'] is None:
+                continue
+            cell = row.get('geohash') or geohash.encode(row['latitude'], row['longitude'])
+            cells.append(cell[:self.precision])
+            categories.append(row['category'] or "Unknown")
+            timestamps.append(row['timestamp'])
+        return np.array(cells), np.array(categories), to_buckets(timestamps, self.bucket_seconds)
+
+    def record(self, rows):
+        """Count newly committed report rows"""
+        with self._lock:
+            if self.building:
+                self._pending.extend(rows)
+                return
+            if not self.ready:
+                return  # the first rebuild will read them from the database
+            rows = [row for row in rows if row['id'] > self.loaded_through_id]
+            cells, categories, buckets = self._columns(rows)
+            if len(cells):
+                self._add(self.grids, cells, categories, buckets)
+
+    def rebuild(self, now=None):
+        """Recount the whole window from the database (needs an app context)"""
+        with self._build_lock:
+            with self._lock:
+                self.building = True
+            try:
+                return self._rebuild(now)
+            finally:
+                with self._lock:
+                    self.building = False
+                    self._pending = []
+
+    def _rebuild(self, now):
+        """Build fresh grids from the database, then swap them in"""
+        now = now or datetime.utcnow()
+        now_bucket = int(to_buckets([now], self.bucket_seconds)[0])
+        since = datetime.fromtimestamp((now_bucket - self.n_buckets + 1) * self.bucket_seconds,
+                                       timezone.utc).replace(tzinfo=None)
+        grids = {}
+        self._grid(grids, None).advance(now_bucket)
+        last_id = 0
+        # Cells and epoch seconds are computed by the database where possible,
+        # which spares building a Python datetime per row
+        connection = db.session.connection()
+        seconds = epoch_seconds(CrimeReport.timestamp, connection.dialect.name)
+        time_column = CrimeReport.timestamp if seconds is None else seconds
+        category = func.coalesce(CrimeReport.category, "Unknown")
+        filters = (
+            CrimeReport.trust_score > VERIFIED_THRESHOLD,
+            CrimeReport.canonical_id.is_(None),
+            CrimeReport.timestamp >= since,
+            CrimeReport.latitude.isnot(None),
+            CrimeReport.longitude.isnot(None)
+        )
+        statements = (
+            (False, select(CrimeReport.id, func.substr(CrimeReport.geohash, 1, self.precision), category,
+                           time_column).where(*filters, CrimeReport.geohash.isnot(None))),
+            # Rows saved before geohashes were stored are encoded here
+            (True, select(CrimeReport.id, CrimeReport.latitude, CrimeReport.longitude, category,
+                          time_column).where(*filters, CrimeReport.geohash.is_(None))),
+        )
+        for legacy, stmt in statements:
+            stmt = stmt.execution_options(yield_per=HOTSPOT_REBUILD_CHUNK, stream_results=True)
+            for chunk in connection.execute(stmt).partitions():
+                if legacy:
+                    ids, latitudes, longitudes, categories, times = zip(*chunk)
+                    cells = [geohash.encode(lat, lng, self.precision) for lat, lng in zip(latitudes, longitudes)]
+                else:
+                    ids, cells, categories, times = zip(*chunk)
+                if seconds is None:
+                    buckets = to_buckets(times, self.bucket_seconds)
+                else:
+                    buckets = np.array(times, dtype=np.int64) // self.bucket_seconds
+                self._add(grids, np.array(cells), np.array(categories), buckets)
+                last_id = max(last_id, max(ids))
+        for grid in grids.values():
+            grid.advance(now_bucket)
+
+        with self._lock:
+            self.grids = grids
+            self.loaded_through_id = last_id
+            self.ready = True
+            self.building = False
+            pending, self._pending = self._pending, []
+        # Reports committed while the query ran
+        self.record(pending)
+        return len(grids[None].cells)
+
+    def ensure_loaded(self):
+        if not self.ready:
+            with self._build_lock:
+                if not self.ready:
+                    self.rebuild()
+
+    def detect(self, category=None, now=None, min_count=HOTSPOT_MIN_COUNT,
+               threshold=HOTSPOT_Z_THRESHOLD, limit=50):
+        """Cells whose recent count spikes above their baseline, highest score first"""
+        self.ensure_loaded()
+        now_bucket = int(to_buckets([now or datetime.utcnow()], self.bucket_seconds)[0])
+        with self._lock:
+            grid = self.grids.get(category)
+            if grid is None or not grid.cells:
+                return []
+            for each in self.grids.values():
+                each.advance(now_bucket)
+            recent, baseline = grid.window_counts(self.recent_buckets)
+            scores, expected = poisson_scores(recent, baseline, self.recent_buckets, self.baseline_buckets)
+            flagged = np.flatnonzero((recent >= min_count) & (scores >= threshold))
+            flagged = flagged[np.argsort(-scores[flagged], kind="stable")][:limit]
+            cells = [grid.cells[i] for i in flagged]
+            breakdown = self._category_breakdown(cells) if category is None else None
+
+        hotspots = []
+        for position, i in enumerate(flagged):
+            cell = cells[position]
+            latitude, longitude = geohash.decode(cell)
+            hotspot = {
+                "cell": cell,
+                "latitude": latitude,
+                "longitude": longitude,
+                "bounds": list(geohash.decode_bbox(cell)),
+                "recent_count": int(recent[i]),
+                "baseline_count": int(baseline[i]),
+                "expected": round(float(expected[i]), 3),
+                "score": round(float(scores[i]), 2),
+            }
+            if breakdown is not None:
+                hotspot["categories"] = breakdown[position]
+            hotspots.append(hotspot)
+        return hotspots
+
+    def _category_breakdown(self, cells):
+        """Recent counts per category for each of `cells` (caller holds the lock)"""
+        breakdown = [{} for _ in cells]
+        for category, grid in self.grids.items():
+            if category is None:
+                continue
+            rows = [grid.rows.get(cell) for cell in cells]
+            present = [position for position, row in enumerate(rows) if row is not None]
+            if not present:
+                continue
+            recent_slots = (grid.head - np.arange(self.recent_buckets)) % grid.n_buckets
+            counts = grid.counts[[rows[position] for position in present]][:, recent_slots].sum(axis=1)
+            for position, count in zip(present, counts):
+                if count:
+                    breakdown[position][category] = int(count)
+        return breakdown
+
+    def settings(self):
+        return {
+            "precision": self.precision,
+            "bucket_minutes": self.bucket_seconds // 60,
+            "recent_buckets": self.recent_buckets,
+            "baseline_buckets": self.baseline_buckets,
+        }
+
+hotspot_engine = HotspotEngine()
+
+@register_commit_hook
+def record_hotspot_reports(rows):
+    """Count newly committed reports into the hotspot grids"""
+    hotspot_engine.record(rows)
@@ -0,0 +1,154 @@
+"""Pluggable inference backends for the crime alert classifier.
+
+Every backend exposes predict_proba(texts) -> list of per-class probability
+lists, so model_utils can batch and map labels the same way regardless of how
+the forward pass runs:
+
+- torch:     full-precision PyTorch (reference)
+- quantized: PyTorch with dynamic INT8 quantization of the Linear layers
+- onnx:      an exported ONNX graph run with onnxruntime (see model_export.py)
+- stub:      a tiny keyword scorer with no ML dependencies, for benchmarks and
+             offline development
+- remote:    a client of the shared model server (see model_server.py)
+"""
+import math
+import os
+import threading
+
+MODEL_NAME = "toladimeji/bert_crime_alert_classifier"
+MAX_LENGTH = 512
+BACKENDS = ("torch", "quantized", "onnx", "stub", "remote")
+
+class TorchBackend:
+    """Full-precision PyTorch inference"""
+    name = "torch"
+
+    def __init__(self, model_name=MODEL_NAME, **hub_kwargs):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, **hub_kwargs)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name, **hub_kwargs)
+        self.model.eval()
+
+    def predict_proba(self, texts):
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding="longest", max_length=MAX_LENGTH)
+
+        with self.torch.no_grad():
+            outputs = self.model(**inputs)
+            predictions = self.torch.nn.functional.softmax(outputs.logits, dim=-1)
+        return predictions.tolist()
+
+    def share_memory(self):
+        """Move the weights into shared memory so forked workers reuse them"""
+        self.model.share_memory()
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch with dynamic INT8 quantization - smaller and faster on CPU"""
+    name = "quantized"
+
+    def __init__(self, model_name=MODEL_NAME, **hub_kwargs):
+        super().__init__(model_name, **hub_kwargs)
+        self.model = self.torch.quantization.quantize_dynamic(
+            self.model, {self.torch.nn.Linear}, dtype=self.torch.qint8
+        )
+
+class OnnxBackend:
+    """Exported ONNX model run with onnxruntime on CPU"""
+    name = "onnx"
+
+    def __init__(self, model_path, tokenizer_path=None, **hub_kwargs):
+        import numpy as np
+        import onnxruntime
+        from transformers import AutoTokenizer
+        self.np = np
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path or os.path.dirname(model_path), **hub_kwargs)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def predict_proba(self, texts):
+        encoded = self.tokenizer(texts, return_tensors="np", truncation=True, padding="longest", max_length=MAX_LENGTH)
+        feed = {name: value.astype(self.np.int64) for name, value in encoded.items() if name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        # Numerically stable softmax
+        exp = self.np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return (exp / exp.sum(axis=-1, keepdims=True)).tolist()
+
+class StubBackend:
+    """Keyword scorer standing in for BERT (no torch, no network)"""
+    name = "stub"
+    KEYWORDS = ("robbery", "theft", "assault", "stolen", "attack", "gun", "knife", "kidnap", "burglary", "fight")
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def predict_proba(self, texts):
+        probabilities = []
+        for text in texts:
+            lowered = text.lower()
+            score = sum(keyword in lowered for keyword in self.KEYWORDS)
+            real = 1.0 / (1.0 + math.exp(-(2.0 * score - 1.0)))
+            probabilities.append([1.0 - real, real])
+        return probabilities
+
+class RemoteBackend:
+    """Thin client of model_server.py - one connection per calling thread"""
+    name = "remote"
+
+    def __init__(self, address=None, connect_timeout=None):
+        from model_server import MODEL_SERVER_ADDRESS, MODEL_SERVER_AUTHKEY, connect
+        self._connect = connect
+        self.address = address or MODEL_SERVER_ADDRESS
+        self.authkey = MODEL_SERVER_AUTHKEY
+        self._local = threading.local()
+        if connect_timeout is None:
+            connect_timeout = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "30"))
+        # Fail the load (and fall back) if no server shows up in time
+        self._local.conn = connect(self.address, self.authkey, timeout=connect_timeout)
+        self.server_info = self._call("ping")
+
+    def _call(self, *request):
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect(self.address, self.authkey)
+                conn.send(request)
+                status, payload = conn.recv()
+                break
+            except (EOFError, OSError):
+                # Server restarted a worker - reconnect once
+                self._local.conn = None
+                if conn is not None:
+                    conn.close()
+                if attempt:
+                    raise
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def predict_proba(self, texts):
+        return self._call("predict_proba", list(texts))
+
+def load_backend(name, model_name=MODEL_NAME, onnx_path=None, **hub_kwargs):
+    """Instantiate a backend by name; hub_kwargs (token, cache_dir, local_files_only) go to from_pretrained"""
+    if name == "torch":
+        return TorchBackend(model_name, **hub_kwargs)
+    if name == "quantized":
+        return QuantizedTorchBackend(model_name, **hub_kwargs)
+    if name == "onnx":
+        if not onnx_path:
+            raise ValueError("ONNX_MODEL_PATH must point to an exported model.onnx")
+        return OnnxBackend(onnx_path, **hub_kwargs)
+    if name == "stub":
+        return StubBackend()
+    if name == "remote":
+        return RemoteBackend()
+    raise ValueError(f"Unknown model backend '{name}' (choose from {', '.join(BACKENDS)})")
+
+def argmax(probabilities):
+    """Index and value of the most likely class"""
+    best = max(range(len(probabilities)), key=probabilities.__getitem__)
+    return best, probabilities[best]
@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _PendingRequest:
+    """A single text waiting in the queue together with the future of its caller"""
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchInferenceEngine:
+    """Micro-batching front end for the classifier.
+
+    Concurrent callers put their text on a shared queue. A single worker thread
+    collects up to `max_batch_size` texts (or whatever arrived before
+    `max_wait_ms` elapsed), runs `batch_fn` once over the whole group and hands
+    each result back through the caller's future.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._batches = 0
+        self._requests = 0
+        self._max_batch = 0
+        self._batch_sizes = {}
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._errors = 0
+
+    def start(self):
+        """Start the worker thread (idempotent)"""
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="bert-batch-worker", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, text):
+        """Queue a text for classification and return a Future for its result"""
+        self.start()
+        pending = _PendingRequest(text)
+        self._queue.put(pending)
+        return pending.future
+
+    def classify(self, text, timeout=None):
+        """Synchronous helper: submit and wait for the result"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Deadline passed - still take anything that is already waiting
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.monotonic()
+            self._record_batch(batch, started)
+            try:
+                results = self.batch_fn([item.text for item in batch])
+                for item, result in zip(batch, results):
+                    item.future.set_result(result)
+            except Exception as e:
+                with self._metrics_lock:
+                    self._errors += 1
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def _record_batch(self, batch, started):
+        waits = [started - item.enqueued_at for item in batch]
+        size = len(batch)
+        with self._metrics_lock:
+            self._batches += 1
+            self._requests += size
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def metrics(self):
+        """Snapshot of batch size and queue wait statistics"""
+        with self._metrics_lock:
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "errors": self._errors,
+                "queue_depth": self._queue.qsize(),
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "batch_size_counts": dict(self._batch_sizes),
+                "avg_queue_wait_ms": 1000.0 * self._total_wait / self._requests if self._requests else 0.0,
+                "max_queue_wait_ms": 1000.0 * self._max_wait_seen,
+            }
@@ -2,12 +2,20 @@ from typing import Tuple, Union, TypedDict
 from geopy.distance import geodesic
 from model_utils import model_classifier
 from geo_utils import get_coordinates_from_text
+from gazetteer import get_gazetteer
 
 class AlertFilterState(TypedDict):
     user_report: str
     trust_score: Union[float, int]
     gps_location: Tuple[float, float]
     alert_type: str
+    # 'gps', 'text' or 'default' - how gps_location was determined
+    location_source: str
+
+# Lagos - used when no location can be determined
+DEFAULT_LOCATION = (6.6018, 3.3515)
+# Reports whose coordinates are further than this from the place named in their text are penalized
+LOCATION_CONSISTENCY_KM = 50
 
 def user_input_node(state: AlertFilterState):
     """Extract location from user report text"""
@@ -16,6 +24,7 @@ def user_input_node(state: AlertFilterState):
     # If GPS coordinates are provided (not default), use them
     if state["gps_location"] != (0.0, 0.0):
         print(f" Using GPS coordinates: {state['gps_location']}")
+        state["location_source"] = "gps"
         return state
     
     # Otherwise, try to extract from text
@@ -23,10 +32,12 @@ def user_input_node(state: AlertFilterState):
     
     if extracted_coords:
         state["gps_location"] = extracted_coords
+        state["location_source"] = "text"
         print(f" Extracted coordinates from text: {extracted_coords}")
     else:
         # Default to Lagos coordinates if extraction fails
-        state["gps_location"] = (6.6018, 3.3515)
+        state["gps_location"] = DEFAULT_LOCATION
+        state["location_source"] = "default"
         print(" No location found, using default coordinates (Lagos)")
     
     return state
@@ -40,25 +51,34 @@ def validation_node(state: AlertFilterState):
     print(f"AI Classification: {result['predicted_label']} (trust: {result['trust_score']:.2f})")
     return state
 
-def geo_verification_node(state: AlertFilterState):
-    """Optional consistency check for location"""
-    report_text = state["user_report"]
-    extracted_coords = state["gps_location"]
-    
-    # Skip verification if using default coordinates
-    if extracted_coords == (6.6018, 3.3515):
-        print(" Skipping geo verification for default coordinates")
-        return state
-    
-    second_extraction = get_coordinates_from_text(report_text)
-    if second_extraction:
-        distance_km = geodesic(extracted_coords, second_extraction).km
+def location_checked_trust(report_text, location, trust_score):
+    """Trust score after cross-checking `location` against the place named in the text.
+
+    The place comes from the offline gazetteer, so this is in-memory. It only
+    depends on the text and location, so it may be cached with the rest of the
+    pipeline result; corroboration (corroboration.apply_corroboration) may not.
+    """
+    gazetteer = get_gazetteer()
+    mentioned = gazetteer.geocode(report_text) if gazetteer else None
+    if mentioned:
+        distance_km = geodesic(location, mentioned).km
         print(f" Location consistency: {distance_km:.2f} km difference")
         
-        if distance_km > 50:
+        if distance_km > LOCATION_CONSISTENCY_KM:
             print(" Inconsistent location - penalizing trust")
-            state["trust_score"] *= 0.8
+            trust_score *= 0.8
         else:
             print("✅ Location verified")
+    return trust_score
+
+def geo_verification_node(state: AlertFilterState):
+    """Consistency check between the location and the place named in the text"""
+    extracted_coords = state["gps_location"]
+    
+    # Skip verification if no location was found (a named place may share the default's coordinates)
+    if state.get("location_source") == "default":
+        print(" Skipping geo verification for default coordinates")
+        return state
     
+    state["trust_score"] = location_checked_trust(state["user_report"], extracted_coords, state["trust_score"])
     return state
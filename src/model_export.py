@@ -0,0 +1,120 @@
+"""Export the classifier to ONNX and verify alternative backends against PyTorch.
+
+    python model_export.py export --output onnx_model
+    python model_export.py verify --backend onnx --onnx-path onnx_model/model.onnx --sample held_out.csv
+    python model_export.py verify --backend quantized --sample held_out.csv
+
+The sample is either a CSV with a 'text' column (the format used in
+Ml_classifier.ipynb) or a plain text file with one report per line. verify
+exits non-zero if label agreement with the reference model is below
+--min-agreement.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from inference_backends import MODEL_NAME, TorchBackend, load_backend, argmax
+
+def export_onnx(output_dir, model_name=MODEL_NAME, opset=17):
+    """Export the PyTorch model and its tokenizer to `output_dir`"""
+    import torch
+    reference = TorchBackend(model_name, token=os.getenv("HUGGINGFACE_TOKEN"))
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = reference.tokenizer(["armed robbery reported near the bus stop"], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    model_path = os.path.join(output_dir, "model.onnx")
+
+    torch.onnx.export(
+        reference.model,
+        tuple(sample[name] for name in input_names),
+        model_path,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+    )
+    reference.tokenizer.save_pretrained(output_dir)
+    print(f"✅ Exported ONNX model to {model_path}")
+    return model_path
+
+def load_sample(path, limit=None):
+    """Read held-out report texts from a CSV ('text' column) or a text file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            texts = [row["text"] for row in csv.DictReader(f) if row.get("text")]
+        else:
+            texts = [line.strip() for line in f if line.strip()]
+    return texts[:limit] if limit else texts
+
+def _timed_predict(backend, texts, batch_size):
+    probabilities = []
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        probabilities.extend(backend.predict_proba(texts[start:start + batch_size]))
+    return probabilities, time.perf_counter() - started
+
+def verify(candidate, texts, batch_size=16, model_name=MODEL_NAME):
+    """Compare a candidate backend with full-precision PyTorch on `texts`"""
+    reference = TorchBackend(model_name, token=os.getenv("HUGGINGFACE_TOKEN"))
+    expected, reference_seconds = _timed_predict(reference, texts, batch_size)
+    actual, candidate_seconds = _timed_predict(candidate, texts, batch_size)
+
+    agree = sum(argmax(e)[0] == argmax(a)[0] for e, a in zip(expected, actual))
+    max_diff = max(
+        (abs(x - y) for e, a in zip(expected, actual) for x, y in zip(e, a)), default=0.0
+    )
+    return {
+        "samples": len(texts),
+        "label_agreement": agree / len(texts) if texts else 1.0,
+        "max_probability_diff": max_diff,
+        "reference_seconds": reference_seconds,
+        "candidate_seconds": candidate_seconds,
+        "speedup": reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export the model to ONNX")
+    export_parser.add_argument("--output", default="onnx_model")
+    export_parser.add_argument("--model", default=MODEL_NAME)
+    export_parser.add_argument("--opset", type=int, default=17)
+
+    verify_parser = commands.add_parser("verify", help="check a backend against PyTorch")
+    verify_parser.add_argument("--backend", choices=("quantized", "onnx"), required=True)
+    verify_parser.add_argument("--onnx-path", default=os.getenv("ONNX_MODEL_PATH"))
+    verify_parser.add_argument("--sample", required=True, help="held-out CSV or text file")
+    verify_parser.add_argument("--limit", type=int)
+    verify_parser.add_argument("--batch-size", type=int, default=16)
+    verify_parser.add_argument("--min-agreement", type=float, default=0.98)
+    verify_parser.add_argument("--model", default=MODEL_NAME)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_onnx(args.output, args.model, args.opset)
+        return 0
+
+    texts = load_sample(args.sample, args.limit)
+    if not texts:
+        print("⚠️ Sample is empty")
+        return 1
+    candidate = load_backend(args.backend, args.model, onnx_path=args.onnx_path,
+                             token=os.getenv("HUGGINGFACE_TOKEN"))
+    report = verify(candidate, texts, args.batch_size, args.model)
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+    if report["label_agreement"] < args.min_agreement:
+        print(f"❌ Label agreement below {args.min_agreement:.2%}")
+        return 1
+    print("✅ Backend verified")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Shared inference worker pool for multi-process web deployments.
+
+Each gunicorn worker importing model_utils would hold its own copy of BERT.
+Instead, run one model server and point the web workers at it:
+
+    python model_server.py --workers 2
+    MODEL_BACKEND=remote gunicorn -w 8 main:app
+
+The server loads the weights once (transformers memory-maps safetensors
+checkpoints), moves them into shared memory and then forks the worker
+processes, so every worker reads the same physical pages. Workers accept
+connections on one local socket and batch requests from all web workers
+through a BatchInferenceEngine. Web workers use RemoteBackend
+(inference_backends.py) as a thin client.
+
+multiprocessing connections unpickle what they receive, so the server only
+starts with a MODEL_SERVER_AUTHKEY set, keeps its unix socket in a directory
+only its user can enter, and only listens on loopback TCP addresses.
+"""
+import argparse
+import ipaddress
+import multiprocessing
+import os
+import signal
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener, wait
+from inference_engine import BatchInferenceEngine
+from inference_backends import MODEL_NAME, load_backend
+
+# Unix socket path (in a per-user private directory by default), or a loopback host:port for TCP
+MODEL_SERVER_ADDRESS = os.getenv("MODEL_SERVER_ADDRESS", os.path.join(
+    tempfile.gettempdir(), f"crime-alert-model-{os.getuid()}", "model.sock"))
+# Required: shared secret between the server and the web workers
+MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY", "").encode()
+MODEL_SERVER_WORKERS = int(os.getenv("MODEL_SERVER_WORKERS", "1"))
+# Backend the server itself runs (MODEL_BACKEND on the web side is "remote")
+MODEL_SERVER_BACKEND = os.getenv("MODEL_SERVER_BACKEND", "torch").lower()
+# Torch threads per worker process (0 = torch default)
+MODEL_SERVER_THREADS = int(os.getenv("MODEL_SERVER_THREADS", "0"))
+
+def parse_address(address):
+    """'host:port' -> (host, port) for TCP; anything else is a unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and host and port.isdigit() and "/" not in address:
+        return host, int(port)
+    return address
+
+def require_authkey(authkey):
+    if not authkey:
+        raise ValueError("MODEL_SERVER_AUTHKEY is not set; use the same secret for the model server and the web workers")
+
+def check_tcp_host(host):
+    """Refuse to listen anywhere but loopback: the protocol trusts its peers with pickles"""
+    if host == "localhost":
+        return
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Model server only listens on loopback addresses, not {host!r}")
+
+def prepare_socket_directory(path):
+    """Create the socket's directory with mode 0700, or check that an existing one is private"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise ValueError(f"Socket directory {directory} must be owned by this user and not accessible to others")
+
+def check_server_address(address):
+    """Parsed `address`, after making sure it is safe to listen on"""
+    address = parse_address(address)
+    if isinstance(address, str):
+        prepare_socket_directory(address)
+    else:
+        check_tcp_host(address[0])
+    return address
+
+def connect(address=MODEL_SERVER_ADDRESS, authkey=MODEL_SERVER_AUTHKEY, timeout=0.0):
+    """Open a client connection, retrying until `timeout` seconds have passed"""
+    require_authkey(authkey)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(parse_address(address), authkey=authkey)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.2)
+
+def _handle_connection(conn, engine, info):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+            op = request[0] if request else None
+            try:
+                if op == "ping":
+                    response = ("ok", info)
+                elif op == "predict_proba":
+                    futures = [engine.submit(text) for text in request[1]]
+                    response = ("ok", [future.result() for future in futures])
+                elif op == "metrics":
+                    response = ("ok", engine.metrics())
+                else:
+                    response = ("error", f"Unknown request {op!r}")
+            except Exception as e:
+                response = ("error", str(e))
+            try:
+                conn.send(response)
+            except OSError:
+                return
+
+def serve(listener, backend, max_batch_size, max_wait_ms):
+    """Worker process: accept clients and answer them from one batching engine"""
+    # The supervisor handles Ctrl-C and terminates workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if MODEL_SERVER_THREADS and hasattr(backend, "torch"):
+        backend.torch.set_num_threads(MODEL_SERVER_THREADS)
+    engine = BatchInferenceEngine(backend.predict_proba, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    info = {"backend": backend.name, "pid": os.getpid()}
+    while True:
+        try:
+            conn = listener.accept()
+        except multiprocessing.AuthenticationError:
+            print("⚠️ Model server rejected a client with the wrong authkey")
+            continue
+        except OSError:
+            return
+        threading.Thread(target=_handle_connection, args=(conn, engine, info), daemon=True).start()
+
+def run_server(address, workers, backend_name, max_batch_size, max_wait_ms, onnx_path=None):
+    """Load the model once, then fork `workers` processes sharing it; blocks until interrupted"""
+    require_authkey(MODEL_SERVER_AUTHKEY)
+    address = check_server_address(address)
+
+    started = time.perf_counter()
+    hub_kwargs = {"token": os.getenv("HUGGINGFACE_TOKEN")}
+    if os.getenv("MODEL_CACHE_DIR"):
+        hub_kwargs["cache_dir"] = os.getenv("MODEL_CACHE_DIR")
+    if os.getenv("MODEL_LOCAL_ONLY", "0") == "1":
+        hub_kwargs["local_files_only"] = True
+    backend = load_backend(backend_name, MODEL_NAME, onnx_path=onnx_path, **hub_kwargs)
+    # Anonymous shared memory survives fork without being copied on write
+    if hasattr(backend, "share_memory"):
+        backend.share_memory()
+    print(f"✅ Model loaded in {time.perf_counter() - started:.1f}s ({backend.name} backend)")
+
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)  # stale socket from a previous run
+    # The socket is created 0600 rather than chmod-ed afterwards
+    umask = os.umask(0o177)
+    try:
+        listener = Listener(address, authkey=MODEL_SERVER_AUTHKEY)
+    finally:
+        os.umask(umask)
+
+    context = multiprocessing.get_context("fork")
+    stopping = False
+
+    def spawn():
+        process = context.Process(target=serve, args=(listener, backend, max_batch_size, max_wait_ms),
+                                  name="model-worker", daemon=True)
+        process.start()
+        return process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    processes = [spawn() for _ in range(max(1, workers))]
+    print(f"✅ Model server listening on {address} with {len(processes)} worker(s)")
+
+    try:
+        while True:
+            wait([process.sentinel for process in processes])
+            for i, process in enumerate(processes):
+                if not process.is_alive() and not stopping:
+                    print(f"⚠️ Model worker {process.pid} exited with {process.exitcode}, restarting")
+                    processes[i] = spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+        listener.close()
+        print("Model server stopped")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=MODEL_SERVER_ADDRESS, help="Unix socket path or host:port")
+    parser.add_argument("--workers", type=int, default=MODEL_SERVER_WORKERS)
+    parser.add_argument("--backend", default=MODEL_SERVER_BACKEND, choices=("torch", "quantized", "onnx", "stub"))
+    parser.add_argument("--onnx-path", default=os.getenv("ONNX_MODEL_PATH"))
+    parser.add_argument("--max-batch-size", type=int, default=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16")))
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.getenv("INFERENCE_MAX_WAIT_MS", "5")))
+    args = parser.parse_args(argv)
+    try:
+        require_authkey(MODEL_SERVER_AUTHKEY)
+        check_server_address(args.address)
+    except ValueError as e:
+        parser.error(str(e))
+    run_server(args.address, args.workers, args.backend, args.max_batch_size, args.max_wait_ms, args.onnx_path)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,123 @@
 import os
+import threading
+import time
+from inference_engine import BatchInferenceEngine
+from inference_backends import MODEL_NAME, load_backend, argmax
+from dedup import deduplicator
+from telemetry import span, inference_batch_size
 
-# Try to import AI libraries, fallback if not available
-try:
-    import torch
-    from transformers import AutoModelForSequenceClassification, AutoTokenizer
-    AI_LIBS_AVAILABLE = True
-except ImportError:
-    print("⚠️ AI libraries (torch, transformers) not available")
-    AI_LIBS_AVAILABLE = False
+# Backend selection: torch (default), quantized (dynamic INT8), onnx, or remote
+# (a shared model_server.py process, for multi-worker deployments)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch").lower()
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH")
+# Where downloaded weights live; with MODEL_LOCAL_ONLY=1 the hub is never contacted
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR")
+MODEL_LOCAL_ONLY = os.getenv("MODEL_LOCAL_ONLY", "0") == "1"
+# lazy: load on first classification; background: warm in a thread at startup;
+# eager: load when this module is imported (the old behaviour)
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
 
-# Load model from Hugging Face Hub
-MODEL_NAME = "toladimeji/bert_crime_alert_classifier"
+backend = None
+inference_engine = None
+AI_LIBS_AVAILABLE = None  # unknown until the first load attempt
+_load_lock = threading.Lock()
+_load_state = {"state": "not_loaded", "error": None, "load_seconds": None}
 
-# Load once when module is imported
-if AI_LIBS_AVAILABLE:
-    try:
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, token=os.getenv("HUGGINGFACE_TOKEN"))
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, token=os.getenv("HUGGINGFACE_TOKEN"))
-        print("✅ Model loaded successfully")
-    except Exception as e:
-        print(f"⚠️ Error loading model: {e}")
-        # Fallback to a basic model or create dummy responses
-        tokenizer = None
-        model = None
-else:
-    tokenizer = None
-    model = None
+# Check your model's actual labels - adjust this mapping!
+label_mapping = {0: "fake", 1: "real"}  # Update based on your model
+
+# Micro-batching settings for concurrent requests
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+def _build_result(text, predicted_class_id, confidence_score):
+    """Turn a model prediction into the result dict used by the pipeline"""
+    predicted_label = label_mapping.get(predicted_class_id, "unknown")
+
+    if predicted_label == "fake":
+        trust_score = 0.2 * confidence_score
+    elif predicted_label == "real":
+        trust_score = 0.8 * confidence_score
+    else:
+        trust_score = 0.5
+
+    return {
+        "original_text": text,
+        "predicted_label": predicted_label,
+        "confidence": confidence_score,
+        "trust_score": trust_score
+    }
+
+def classify_batch(texts):
+    """Run one forward pass over a list of texts, padded to the longest member"""
+    inference_batch_size.observe(len(texts))
+    with span("model_forward"):
+        probabilities_list = backend.predict_proba(texts)
+    results = []
+    for text, probabilities in zip(texts, probabilities_list):
+        predicted_class_id, confidence_score = argmax(probabilities)
+        results.append(_build_result(text, predicted_class_id, confidence_score))
+    return results
+
+def load_model():
+    """Load the backend and start the batching engine once; safe to call from any thread.
+
+    Returns the inference engine, or None when the model is unavailable and
+    the keyword fallback should be used.
+    """
+    global backend, inference_engine, AI_LIBS_AVAILABLE
+    if _load_state["state"] in ("ready", "fallback"):
+        return inference_engine
+
+    with _load_lock:
+        if _load_state["state"] in ("ready", "fallback"):
+            return inference_engine
+
+        _load_state["state"] = "loading"
+        started = time.perf_counter()
+        try:
+            hub_kwargs = {"token": os.getenv("HUGGINGFACE_TOKEN")}
+            if MODEL_CACHE_DIR:
+                hub_kwargs["cache_dir"] = MODEL_CACHE_DIR
+            if MODEL_LOCAL_ONLY:
+                hub_kwargs["local_files_only"] = True
+            backend = load_backend(MODEL_BACKEND, MODEL_NAME, onnx_path=ONNX_MODEL_PATH, **hub_kwargs)
+            AI_LIBS_AVAILABLE = True
+            # One engine shares the loaded model between all request threads
+            inference_engine = BatchInferenceEngine(
+                classify_batch,
+                max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+                max_wait_ms=INFERENCE_MAX_WAIT_MS,
+            )
+            _load_state["state"] = "ready"
+            print(f"✅ Model loaded successfully ({backend.name} backend)")
+        except ImportError as e:
+            print(f"⚠️ AI libraries for the '{MODEL_BACKEND}' backend not available: {e}")
+            AI_LIBS_AVAILABLE = False
+            _load_state.update(state="fallback", error=str(e))
+        except Exception as e:
+            print(f"⚠️ Error loading model: {e}")
+            AI_LIBS_AVAILABLE = True
+            _load_state.update(state="fallback", error=str(e))
+        _load_state["load_seconds"] = time.perf_counter() - started
+        return inference_engine
+
+def is_model_ready():
+    """True once loading has finished (with the model or the keyword fallback)"""
+    return _load_state["state"] in ("ready", "fallback")
+
+def model_status():
+    """Loading state for health checks"""
+    return dict(_load_state, backend=MODEL_BACKEND, mode=MODEL_LOAD_MODE)
+
+def inference_metrics():
+    """Batch size and queue wait metrics of the inference engine"""
+    return inference_engine.metrics() if inference_engine else {}
 
 def model_classifier(text):
     """Classify text and return results with trust score"""
-    if not model or not tokenizer:
+    engine = load_model()
+    if not engine:
         # Fallback classification when model is not available
         return {
             "original_text": text,
@@ -39,42 +127,8 @@ def model_classifier(text):
         }
     
     try:
-        if AI_LIBS_AVAILABLE:
-            inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-            
-            with torch.no_grad():
-                outputs = model(**inputs)
-                predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        else:
-            # Fallback when AI libraries not available
-            return {
-                "original_text": text,
-                "predicted_label": "real" if any(word in text.lower() for word in ["robbery", "theft", "assault", "crime"]) else "unknown",
-                "confidence": 0.7,
-                "trust_score": 0.6
-            }
-        
-        predicted_class_id = predictions.argmax().item()
-        confidence_score = predictions[0][predicted_class_id].item()
-        
-        # Check your model's actual labels - adjust this mapping!
-        label_mapping = {0: "fake", 1: "real"}  # Update based on your model
-        
-        predicted_label = label_mapping.get(predicted_class_id, "unknown")
-        
-        if predicted_label == "fake":
-            trust_score = 0.2 * confidence_score
-        elif predicted_label == "real":
-            trust_score = 0.8 * confidence_score
-        else:
-            trust_score = 0.5
-        
-        return {
-            "original_text": text,
-            "predicted_label": predicted_label,
-            "confidence": confidence_score,
-            "trust_score": trust_score
-        }
+        # Identical and near-identical reports reuse an earlier verdict
+        return deduplicator.classify(text, engine.classify)
     
     except Exception as e:
         print(f"Error in model classification: {e}")
@@ -85,3 +139,6 @@ def model_classifier(text):
             "confidence": 0.5,
             "trust_score": 0.5
         }
+
+if MODEL_LOAD_MODE == "eager":
+    load_model()
@@ -4,6 +4,10 @@ from datetime import datetime
 class CrimeReport(db.Model):
     """Model for storing processed crime reports"""
     __tablename__ = 'crime_reports'
+    __table_args__ = (
+        # Serves the verified-reports listing (trust filter + newest first)
+        db.Index('ix_crime_reports_trust_timestamp', 'trust_score', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     original_text = db.Column(db.Text, nullable=False)
@@ -14,6 +18,13 @@ class CrimeReport(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(100), nullable=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Geohash of (latitude, longitude), indexed for bounding-box/radius queries
+    geohash = db.Column(db.String(12), nullable=True, index=True)
+    # Hash of the normalized text, and the earlier report this one duplicates (if any)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    canonical_id = db.Column(db.Integer, db.ForeignKey('crime_reports.id'), nullable=True, index=True)
+    # 'gps', 'text' or 'default' (no location found; latitude/longitude are the Lagos fallback)
+    location_source = db.Column(db.String(16), nullable=True)
     
     def __repr__(self):
         return f'<CrimeReport {self.id}: {self.category} at ({self.latitude}, {self.longitude})>'
@@ -29,5 +40,42 @@ class CrimeReport(db.Model):
             'latitude': self.latitude,
             'longitude': self.longitude,
             'category': self.category,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'canonical_id': self.canonical_id
         }
+
+class CategoryStat(db.Model):
+    """Materialized count of verified reports per category and time bucket.
+
+    bucket is 'hour', 'day' or 'all' (a single all-time row per category whose
+    bucket_start is the epoch). Rows are updated in the same transaction as the
+    CrimeReport inserts they count.
+    """
+    __tablename__ = 'category_stats'
+    
+    bucket = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CategoryStat {self.bucket} {self.bucket_start} {self.category}: {self.count}>'
+
+class ClusterCell(db.Model):
+    """Materialized count of verified, non-duplicate reports per geohash cell.
+
+    One row per (precision, cell, category); lat_sum/lng_sum give the centroid
+    of the reports in the cell. Updated in the same transaction as the
+    CrimeReport inserts they count, and served by /api/clusters and /api/heatmap.
+    """
+    __tablename__ = 'cluster_cells'
+    
+    precision = db.Column(db.Integer, primary_key=True)
+    cell = db.Column(db.String(12), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    lat_sum = db.Column(db.Float, nullable=False, default=0.0)
+    lng_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<ClusterCell {self.precision}:{self.cell} {self.category}: {self.count}>'
@@ -0,0 +1,164 @@
+from datetime import datetime
+from sqlalchemy import insert, update
+from extensions import db
+from models import CrimeReport
+import geohash
+from dedup import DuplicateIndex, deduplicator, content_hash, simhash
+
+# Reports at or below this trust score are not stored
+STORE_THRESHOLD = 0.3
+# Reports above this trust score are shown on the dashboard
+VERIFIED_THRESHOLD = 0.5
+# Characters of report text shown on the map
+TEXT_PREVIEW_LENGTH = 100
+
+# Called with the list of inserted rows (dicts with 'id') inside the insert
+# transaction, before commit - for derived tables that must stay consistent
+_transaction_hooks = []
+
+def register_transaction_hook(hook):
+    """Run `hook(rows)` in the same transaction as every report insert"""
+    _transaction_hooks.append(hook)
+    return hook
+
+def _run_transaction_hooks(rows):
+    for hook in _transaction_hooks:
+        hook(rows)
+
+# Called with the committed rows after a successful commit - for notifying
+# in-process consumers (live feed, caches). Failures are logged, not raised.
+_commit_hooks = []
+
+def register_commit_hook(hook):
+    """Run `hook(rows)` after every committed report insert"""
+    _commit_hooks.append(hook)
+    return hook
+
+def _run_commit_hooks(rows):
+    for hook in _commit_hooks:
+        try:
+            hook(rows)
+        except Exception as e:
+            print(f"Error in commit hook {getattr(hook, '__name__', hook)}: {e}")
+
+@register_commit_hook
+def remember_saved_reports(rows):
+    """Index saved reports so later copies are linked to them"""
+    for row in rows:
+        deduplicator.remember_report(row['original_text'], row['id'], row.get('canonical_id'))
+
+def should_store(result):
+    """Whether a pipeline result is trusted enough to be saved"""
+    return result.get('trust_score', 0) > STORE_THRESHOLD
+
+def find_canonical_id(user_report):
+    """Id of the earliest saved report this text duplicates, or None"""
+    canonical_id = deduplicator.find_canonical(user_report)
+    if canonical_id is None:
+        # Exact duplicates of reports saved before this process started
+        match = db.session.query(CrimeReport.id, CrimeReport.canonical_id).filter(
+            CrimeReport.content_hash == content_hash(user_report)
+        ).order_by(CrimeReport.id).first()
+        if match:
+            canonical_id = match.canonical_id or match.id
+    return canonical_id
+
+def build_report_row(user_report, result):
+    """Build the CrimeReport column values for a processed report"""
+    latitude, longitude = result['gps_location']
+    return {
+        'original_text': user_report,
+        'predicted_label': result.get('alert_type', 'unknown'),
+        'confidence': 0.8,  # This would come from the model in a real scenario
+        'trust_score': result.get('trust_score', 0),
+        'latitude': latitude,
+        'longitude': longitude,
+        'category': result.get('alert_type', 'Unknown').title(),
+        'timestamp': datetime.utcnow(),
+        'geohash': geohash.encode(latitude, longitude),
+        'content_hash': content_hash(user_report),
+        'canonical_id': find_canonical_id(user_report),
+        'location_source': result.get('location_source')
+    }
+
+def text_preview(text):
+    """Truncate report text for map popups"""
+    return text[:TEXT_PREVIEW_LENGTH] + '...' if len(text) > TEXT_PREVIEW_LENGTH else text
+
+def report_summary(row):
+    """The map-facing fields of a saved report row, as served by /api/reports"""
+    return {
+        'id': row['id'],
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+        'category': row['category'],
+        'trust_score': row['trust_score'],
+        'timestamp': row['timestamp'].isoformat(),
+        'original_text': text_preview(row['original_text'])
+    }
+
+def save_report(row):
+    """Insert a single report and commit, returning the saved CrimeReport"""
+    crime_report = CrimeReport(**row)
+    try:
+        db.session.add(crime_report)
+        db.session.flush()
+        saved_rows = [dict(row, id=crime_report.id)]
+        _run_transaction_hooks(saved_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    _run_commit_hooks(saved_rows)
+    return crime_report
+
+def link_chunk_duplicates(rows):
+    """Set canonical_id on inserted rows that duplicate an earlier row of the same chunk.
+
+    build_report_row looks canonical ids up before any row of a chunk is
+    saved, so copies within one batch or write-behind group are only found
+    here. Returns the rows that were linked.
+    """
+    index = DuplicateIndex(max_entries=len(rows))
+    linked = []
+    for row in rows:
+        fingerprint = simhash(row['original_text'])
+        if row.get('canonical_id') is None:
+            entry = index.get(row['content_hash'])
+            if entry is None:
+                entry = index.nearest(fingerprint, require="report_id")
+            if entry is not None:
+                row['canonical_id'] = entry["canonical_id"] or entry["report_id"]
+                linked.append(row)
+        index.add(row['content_hash'], fingerprint, report_id=row['id'], canonical_id=row.get('canonical_id'))
+    return linked
+
+def save_reports(rows):
+    """Insert a chunk of reports with one bulk INSERT and commit.
+
+    Returns the new ids in the same order as `rows`.
+    """
+    if not rows:
+        return []
+    try:
+        # Rows built before earlier chunks were committed may only now find their original
+        rows = [row if row.get('canonical_id') is not None
+                else dict(row, canonical_id=deduplicator.find_canonical(row['original_text']))
+                for row in rows]
+        ids = db.session.scalars(
+            insert(CrimeReport).returning(CrimeReport.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        saved_rows = [dict(row, id=report_id) for row, report_id in zip(rows, ids)]
+        linked = link_chunk_duplicates(saved_rows)
+        if linked:
+            db.session.execute(update(CrimeReport), [
+                {'id': row['id'], 'canonical_id': row['canonical_id']} for row in linked
+            ])
+        _run_transaction_hooks(saved_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    _run_commit_hooks(saved_rows)
+    return list(ids)
@@ -0,0 +1,280 @@
+"""Columnar in-memory store of the newest verified reports for the read path.
+
+Holds the newest READ_STORE_SIZE (or more) verified, non-duplicate reports in parallel
+NumPy columns (id, latitude, longitude, trust score, timestamp in
+microseconds, interned category code), sorted by (timestamp, id). Next to
+the columns, a single bytearray holds each report's map JSON (the
+report_summary fields, with the text already cut to preview length), and an
+offsets column indexes it. A page of /api/reports is a vectorized mask over
+the columns plus a join of byte slices. No ORM objects or dicts are built.
+
+About 300 bytes per report, against several kilobytes for a CrimeReport
+instance with its identity-map state. A commit hook appends new reports.
+Reports committed by other processes are caught up by id whenever the
+database's latest id moves past what the store has seen.
+
+The store only answers when it can answer exactly. Pages that reach past
+its oldest report, and requests that include duplicates, go to the
+database. READ_STORE_SIZE=0 disables it.
+"""
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from extensions import db
+from models import CrimeReport
+from persistence import VERIFIED_THRESHOLD, TEXT_PREVIEW_LENGTH, register_commit_hook, report_summary
+import geohash
+
+READ_STORE_SIZE = int(os.getenv("READ_STORE_SIZE", "20000"))
+# How far below the last seen id a catch-up re-reads, for ids committed out of order
+CATCH_UP_OVERLAP = 256
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+_HTML_ESCAPES = (("<", "\\u003c"), (">", "\\u003e"), ("&", "\\u0026"), ("'", "\\u0027"))
+
+def htmlsafe_json(value):
+    """Compact, key-sorted JSON with <, >, & and ' escaped, so it can sit in a <script> tag.
+
+    Apart from the escapes this is what jsonify writes. /api/reports uses it on
+    the store and the SQL path alike, so a page has the same bytes either way.
+    """
+    text = json.dumps(value, separators=(",", ":"), sort_keys=True)
+    for char, escape in _HTML_ESCAPES:
+        text = text.replace(char, escape)
+    return text
+
+def to_micros(timestamp):
+    return (timestamp - EPOCH) // MICROSECOND
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+def _coordinate(value):
+    return np.nan if value is None else value
+
+# What the dashboard template reads from a recent alert
+StoredReport = namedtuple("StoredReport", "id latitude longitude category trust_score timestamp original_text")
+
+class ReportStore:
+    COLUMNS = (("ids", np.int64), ("latitudes", np.float64), ("longitudes", np.float64),
+               ("trust_scores", np.float64), ("timestamps", np.int64), ("categories", np.int16))
+
+    def __init__(self, size=READ_STORE_SIZE):
+        self.size = size
+        self.enabled = size > 0
+        # Room for twice the size, so eviction (a compaction) happens once per `size` appends
+        capacity = max(16, 2 * size)
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.count = 0
+        self._json = bytearray()
+        self.category_names = []
+        self._category_codes = {}
+        self.ready = False
+        # True while the store holds every verified report in the database
+        self.complete = False
+        self.seen_through_id = 0
+        self._lock = threading.RLock()
+        self.counters = {"pages": 0, "fallbacks": 0, "appended": 0, "evicted": 0, "catch_ups": 0}
+
+    def _category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.category_names)
+            self.category_names.append(category)
+        return code
+
+    def _evict(self):
+        """Keep only the newest `size` reports (caller holds the lock)"""
+        drop = self.count - self.size
+        if drop <= 0:
+            return
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)
+            column[:self.size] = column[drop:self.count]
+        start = int(self.offsets[drop])
+        del self._json[:start]
+        self.offsets[:self.size + 1] = self.offsets[drop:self.count + 1] - start
+        self.count = self.size
+        self.complete = False
+        self.counters["evicted"] += drop
+
+    def _add(self, row):
+        """Insert one report mapping in (timestamp, id) order (caller holds the lock)"""
+        if row['trust_score'] is None or row['trust_score'] <= VERIFIED_THRESHOLD or row.get('canonical_id'):
+            return
+        n = self.count
+        # A catch-up (sync or load) may already have read a row whose commit hook runs later
+        if n and (self.ids[:n] == row['id']).any():
+            return
+        timestamp = to_micros(row['timestamp'])
+        # Usually an append; reports committed out of order are inserted
+        position = n
+        if n and (timestamp, row['id']) < (self.timestamps[n - 1], self.ids[n - 1]):
+            position = int(np.searchsorted(self.timestamps[:n], timestamp, side="right"))
+            while position > 0 and self.timestamps[position - 1] == timestamp and self.ids[position - 1] > row['id']:
+                position -= 1
+            if position == 0 and not self.complete:
+                return  # older than everything kept; it would leave a gap
+        if n == len(self.ids):
+            self._evict()
+            return self._add(row)
+
+        fragment = htmlsafe_json(report_summary(row)).encode()
+        # A missing coordinate is NaN, which like SQL NULL matches no bbox or radius
+        values = (row['id'], _coordinate(row['latitude']), _coordinate(row['longitude']), row['trust_score'], timestamp,
+                  self._category_code(row['category']))
+        for (name, _), value in zip(self.COLUMNS, values):
+            column = getattr(self, name)
+            column[position + 1:n + 1] = column[position:n]
+            column[position] = value
+        start = int(self.offsets[position])
+        self._json[start:start] = fragment
+        self.offsets[position + 2:n + 2] = self.offsets[position + 1:n + 1] + len(fragment)
+        self.offsets[position + 1] = start + len(fragment)
+        self.count = n + 1
+        self.counters["appended"] += 1
+
+    def record(self, rows):
+        """Add newly committed report rows"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # Checked under the lock: a load() in progress reads these rows itself
+            if not self.ready:
+                return
+            for row in rows:
+                self._add(row)
+                self.seen_through_id = max(self.seen_through_id, row['id'])
+
+    def _query(self):
+        return db.session.query(
+            CrimeReport.id, CrimeReport.latitude, CrimeReport.longitude, CrimeReport.category,
+            CrimeReport.trust_score, CrimeReport.timestamp, CrimeReport.canonical_id,
+            # One character past the preview, so report_summary still adds '...'
+            db.func.substr(CrimeReport.original_text, 1, TEXT_PREVIEW_LENGTH + 1).label('original_text')
+        ).filter(
+            CrimeReport.trust_score > VERIFIED_THRESHOLD,
+            CrimeReport.canonical_id.is_(None)
+        )
+
+    def load(self):
+        """(Re)load the newest `size` reports from the database (needs an app context)"""
+        with self._lock:
+            latest_id = db.session.query(db.func.max(CrimeReport.id)).scalar() or 0
+            rows = self._query().order_by(CrimeReport.timestamp.desc(), CrimeReport.id.desc()).limit(self.size).all()
+            rows = [row._mapping for row in reversed(rows)]
+            # Bulk fill rather than _add, which shifts every column per row
+            values = {
+                "ids": [row['id'] for row in rows],
+                "latitudes": [_coordinate(row['latitude']) for row in rows],
+                "longitudes": [_coordinate(row['longitude']) for row in rows],
+                "trust_scores": [row['trust_score'] for row in rows],
+                "timestamps": [to_micros(row['timestamp']) for row in rows],
+                "categories": [self._category_code(row['category']) for row in rows],
+            }
+            for name, _ in self.COLUMNS:
+                getattr(self, name)[:len(rows)] = values[name]
+            fragments = [htmlsafe_json(report_summary(row)).encode() for row in rows]
+            self._json = bytearray(b"".join(fragments))
+            self.offsets[0] = 0
+            self.offsets[1:len(rows) + 1] = np.cumsum([len(fragment) for fragment in fragments], dtype=np.int64)
+            self.count = len(rows)
+            self.complete = len(rows) < self.size
+            self.seen_through_id = latest_id
+            self.ready = True
+            return len(rows)
+
+    def sync(self, latest_id):
+        """Load on first use, then catch up with reports committed by other processes"""
+        with self._lock:
+            if not self.ready:
+                self.load()
+                return
+            if latest_id <= self.seen_through_id:
+                return
+            rows = self._query().filter(
+                CrimeReport.id > self.seen_through_id - CATCH_UP_OVERLAP
+            ).order_by(CrimeReport.id).all()
+            # _add skips the ids already stored
+            for row in rows:
+                self._add(row._mapping)
+            self.seen_through_id = latest_id
+            self.counters["catch_ups"] += 1
+
+    def _slice_json(self, indexes):
+        offsets, data = self.offsets, self._json
+        return b"[" + b",".join(data[offsets[i]:offsets[i + 1]] for i in indexes) + b"]"
+
+    def page(self, limit, cursor=None, bbox=None, near=None):
+        """(JSON array bytes, (timestamp, id) of the last report if there are more) newest first.
+
+        None when the answer might include reports older than the store holds.
+        """
+        with self._lock:
+            n = self.count
+            timestamps, ids = self.timestamps[:n], self.ids[:n]
+            mask = np.ones(n, dtype=bool)
+            if cursor is not None:
+                cursor_micros, cursor_id = to_micros(cursor[0]), cursor[1]
+                mask &= (timestamps < cursor_micros) | ((timestamps == cursor_micros) & (ids < cursor_id))
+            latitudes, longitudes = self.latitudes[:n], self.longitudes[:n]
+            if bbox is not None:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                mask &= (latitudes >= min_lat) & (latitudes <= max_lat)
+                mask &= (longitudes >= min_lng) & (longitudes <= max_lng)
+            if near is not None:
+                mask &= haversine_km(near[0], near[1], latitudes, longitudes) <= near[2]
+            matches = np.flatnonzero(mask)[::-1][:limit + 1]
+            has_more = len(matches) > limit
+            if not has_more and not self.complete:
+                self.counters["fallbacks"] += 1
+                return None
+            matches = matches[:limit]
+            self.counters["pages"] += 1
+            last = (from_micros(timestamps[matches[-1]]), int(ids[matches[-1]])) if has_more else None
+            # Trailing newline as jsonify adds
+            return self._slice_json(matches) + b"\n", last
+
+    def newest(self, limit, detail=0):
+        """(JSON array text of the newest `limit` reports, StoredReport for the newest `detail`), or None"""
+        with self._lock:
+            if self.count < limit and not self.complete:
+                return None
+            indexes = range(self.count - 1, max(self.count - limit, 0) - 1, -1)
+            records = []
+            for i in list(indexes)[:detail]:
+                summary = json.loads(bytes(self._json[self.offsets[i]:self.offsets[i + 1]]))
+                records.append(StoredReport(
+                    int(self.ids[i]), float(self.latitudes[i]), float(self.longitudes[i]),
+                    self.category_names[self.categories[i]], float(self.trust_scores[i]),
+                    from_micros(self.timestamps[i]), summary['original_text']
+                ))
+            return self._slice_json(indexes).decode(), len(indexes), records
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, enabled=self.enabled, reports=self.count, complete=self.complete,
+                        json_bytes=len(self._json), column_bytes=sum(getattr(self, name).nbytes for name, _ in self.COLUMNS)
+                        + self.offsets.nbytes, categories=len(self.category_names))
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Vectorized geohash.haversine_km from one point to arrays of points"""
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    dphi = phi2 - phi1
+    dlmb = np.radians(longitudes - longitude)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * geohash.EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+report_store = ReportStore()
+
+@register_commit_hook
+def store_saved_reports(rows):
+    """Append newly committed reports to the read store"""
+    report_store.record(rows)
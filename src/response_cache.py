@@ -0,0 +1,132 @@
+"""Version-invalidated cache of rendered dashboard responses.
+
+Dashboard data only changes when a report is committed, so rendered pages
+and JSON payloads are kept until the next commit bumps `data_version` (a
+commit hook). Each entry keeps its body pre-compressed per encoding, so a
+cache hit costs a dict lookup. Entries also expire after
+DASHBOARD_CACHE_MAX_AGE seconds, which bounds staleness when other worker
+processes commit reports this process never hears about.
+
+Brotli is used when the `brotli` package is installed, gzip otherwise.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from persistence import register_commit_hook
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "1") == "1"
+DASHBOARD_CACHE_MAX_AGE = float(os.getenv("DASHBOARD_CACHE_MAX_AGE", "5"))
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "256"))
+# Smaller responses are not worth compressing
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESSIBLE_MIMETYPES = ("text/html", "application/json")
+
+# (gzip level, brotli quality): cached bodies are compressed once, so spend more on them
+FAST_COMPRESSION = (6, 5)
+CACHED_COMPRESSION = (9, 11)
+
+class DataVersion:
+    """Counter bumped whenever reports are committed"""
+
+    def __init__(self):
+        self.value = 0
+        self.changed_at = time.time()
+        self._lock = threading.Lock()
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            self.changed_at = time.time()
+
+data_version = DataVersion()
+
+@register_commit_hook
+def bump_data_version(rows):
+    data_version.bump()
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' or None for a werkzeug Accept-Encoding header"""
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+def compress(body, encoding, levels=FAST_COMPRESSION):
+    if encoding == "br":
+        return brotli.compress(body, quality=levels[1])
+    return gzip.compress(body, compresslevel=levels[0], mtime=0)
+
+class CachedResponse:
+    __slots__ = ("version", "built_at", "etag", "last_modified", "mimetype", "bodies")
+
+    def __init__(self, version, body, mimetype, last_modified):
+        self.version = version
+        self.built_at = time.monotonic()
+        # Content hash, so ETags agree across worker processes
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.last_modified = last_modified
+        self.mimetype = mimetype
+        self.bodies = {None: body}
+
+    def body(self, encoding):
+        """The body in `encoding` (None = identity), compressed on first request"""
+        body = self.bodies.get(encoding)
+        if body is None:
+            body = self.bodies[encoding] = compress(self.bodies[None], encoding, CACHED_COMPRESSION)
+        return body
+
+class ResponseCache:
+    """LRU of CachedResponse by key, valid while data_version is unchanged"""
+
+    def __init__(self, max_entries=DASHBOARD_CACHE_SIZE, max_age=DASHBOARD_CACHE_MAX_AGE):
+        self.max_entries = max(1, max_entries)
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is None or entry.version != data_version.value
+                    or time.monotonic() - entry.built_at > self.max_age):
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        """Store a freshly rendered body, rendered while data_version was `version`"""
+        entry = CachedResponse(version, body, mimetype, data_version.changed_at)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return dict(self.counters, entries=len(self._entries), version=data_version.value,
+                    hit_rate=self.counters["hits"] / lookups if lookups else 0.0,
+                    brotli=brotli is not None)
+
+dashboard_cache = ResponseCache()
@@ -0,0 +1,28 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from extensions import db
+
+def upgrade_schema():
+    """Bring tables created by an older version up to date.
+
+    db.create_all() only creates missing tables, so nullable columns and
+    indexes added to existing models later are created here. Returns a list of
+    what was changed.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        with db.engine.begin() as conn:
+            for column in table.columns:
+                if column.name in columns or not column.nullable:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+                changes.append(f"{table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    return changes
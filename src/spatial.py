@@ -0,0 +1,74 @@
+from sqlalchemy import and_, or_, update
+from extensions import db
+from models import CrimeReport
+import geohash
+
+# Upper bound on geohash cells used to cover a query box
+MAX_QUERY_CELLS = 32
+MAX_RADIUS_KM = 500
+
+def parse_bbox(value):
+    """Parse 'west,south,east,north' (Leaflet's toBBoxString order)"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be 'west,south,east,north'")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError("bbox is out of range or inverted")
+    return min_lat, min_lng, max_lat, max_lng
+
+def parse_near(value, radius_km):
+    """Parse 'lat,lng' plus a radius in km"""
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+        radius_km = float(radius_km)
+    except (ValueError, TypeError):
+        raise ValueError("near must be 'lat,lng' and radius_km a number")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("near is out of range")
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM}")
+    return latitude, longitude, radius_km
+
+def filter_bbox(query, min_lat, min_lng, max_lat, max_lng):
+    """Restrict a CrimeReport query to a bounding box.
+
+    Candidates are pruned with indexed geohash prefix ranges, then checked
+    exactly against the latitude/longitude bounds.
+    """
+    cells = geohash.cover_bbox(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_QUERY_CELLS)
+    if cells and cells != [""]:
+        ranges = [geohash.prefix_range(cell) for cell in cells]
+        query = query.filter(or_(*[
+            and_(CrimeReport.geohash >= lo, CrimeReport.geohash < hi) for lo, hi in ranges
+        ]))
+    return query.filter(
+        CrimeReport.latitude.between(min_lat, max_lat),
+        CrimeReport.longitude.between(min_lng, max_lng)
+    )
+
+def filter_near(query, latitude, longitude, radius_km):
+    """Restrict a query to the box around a circle; pair with within_radius for the exact check"""
+    return filter_bbox(query, *geohash.radius_bbox(latitude, longitude, radius_km))
+
+def within_radius(latitude, longitude, radius_km):
+    """Predicate for rows with .latitude/.longitude inside the circle"""
+    def check(row):
+        return geohash.haversine_km(latitude, longitude, row.latitude, row.longitude) <= radius_km
+    return check
+
+def backfill_geohashes(batch_size=1000):
+    """Compute geohashes for rows that do not have one yet; returns the number updated"""
+    updated = 0
+    while True:
+        rows = db.session.query(CrimeReport.id, CrimeReport.latitude, CrimeReport.longitude).filter(
+            CrimeReport.geohash.is_(None)
+        ).limit(batch_size).all()
+        if not rows:
+            return updated
+        db.session.execute(
+            update(CrimeReport),
+            [{"id": row.id, "geohash": geohash.encode(row.latitude, row.longitude)} for row in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
@@ -1,6 +1,13 @@
 // Dashboard JavaScript functionality
 let map;
 let markers = [];
+let markersById = new Map();
+let markerLayer = null;
+let clusterLayer = null;
+let clusterRequest = null;
+let clusterRefreshTimer = null;
+let statsChart = null;
+let liveFeed = null;
 
 // Initialize the dashboard when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
@@ -8,6 +15,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeChart();
     initializeReportForm();
     loadCrimeData();
+    initializeLiveFeed();
 });
 
 // Initialize Leaflet map
@@ -20,9 +28,97 @@ function initializeMap() {
         attribution: '© OpenStreetMap contributors'
     }).addTo(map);
     
+    // Individual markers when zoomed in, server-side clusters when zoomed out
+    markerLayer = L.layerGroup();
+    clusterLayer = L.layerGroup();
+    map.on('moveend', updateMapMode);
+    updateMapMode();
+    
     console.log('Map initialized');
 }
 
+// Below this zoom level the map shows clusters from /api/clusters
+const CLUSTER_ZOOM_THRESHOLD = 13;
+
+function updateMapMode() {
+    if (map.getZoom() < CLUSTER_ZOOM_THRESHOLD) {
+        map.removeLayer(markerLayer);
+        clusterLayer.addTo(map);
+        loadClusters();
+    } else {
+        map.removeLayer(clusterLayer);
+        markerLayer.addTo(map);
+    }
+}
+
+// Fetch clusters for the visible area and redraw them
+function loadClusters() {
+    if (clusterRequest) {
+        clusterRequest.abort();
+    }
+    clusterRequest = new AbortController();
+    
+    const params = new URLSearchParams({
+        z: map.getZoom(),
+        bbox: map.getBounds().toBBoxString()
+    });
+    fetch(`/api/clusters?${params}`, { signal: clusterRequest.signal })
+        .then(response => response.json())
+        .then(data => {
+            if (data.clusters) {
+                drawClusters(data.clusters);
+            }
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError') {
+                console.error('Error loading clusters:', error);
+            }
+        });
+}
+
+function drawClusters(clusters) {
+    clusterLayer.clearLayers();
+    clusters.forEach(cluster => {
+        const color = getCrimeColor(cluster.dominant_category);
+        const marker = L.circleMarker([cluster.latitude, cluster.longitude], {
+            color: color,
+            fillColor: color,
+            fillOpacity: 0.6,
+            radius: Math.min(10 + 4 * Math.log2(cluster.count), 40),
+            weight: 2
+        });
+        
+        const breakdown = Object.entries(cluster.categories)
+            .sort((a, b) => b[1] - a[1])
+            .map(([category, count]) => `${category}: ${count}`)
+            .join('<br>');
+        marker.bindTooltip(`<strong>${cluster.count} reports</strong><br>${breakdown}`);
+        
+        // Clicking a cluster zooms into its cell
+        marker.on('click', () => {
+            const [south, west, north, east] = cluster.bounds;
+            map.fitBounds([[south, west], [north, east]]);
+        });
+        marker.addTo(clusterLayer);
+    });
+}
+
+// Coalesce cluster refreshes triggered by live updates
+function scheduleClusterRefresh() {
+    if (clusterRefreshTimer || !map.hasLayer(clusterLayer)) {
+        return;
+    }
+    clusterRefreshTimer = setTimeout(() => {
+        clusterRefreshTimer = null;
+        loadClusters();
+    }, 2000);
+}
+
+const CHART_COLORS = [
+    '#dc3545', '#fd7e14', '#28a745', '#007bff', 
+    '#6f42c1', '#e83e8c', '#20c997', '#ffc107'
+];
+
 // Initialize Chart.js statistics
 function initializeChart() {
     const ctx = document.getElementById('crime-stats-chart').getContext('2d');
@@ -39,18 +135,14 @@ function initializeChart() {
     
     const labels = Object.keys(stats);
     const data = Object.values(stats);
-    const colors = [
-        '#dc3545', '#fd7e14', '#28a745', '#007bff', 
-        '#6f42c1', '#e83e8c', '#20c997', '#ffc107'
-    ];
     
-    new Chart(ctx, {
+    statsChart = new Chart(ctx, {
         type: 'doughnut',
         data: {
             labels: labels,
             datasets: [{
                 data: data,
-                backgroundColor: colors.slice(0, labels.length),
+                backgroundColor: CHART_COLORS.slice(0, labels.length),
                 borderWidth: 2,
                 borderColor: '#2c3e50'
             }]
@@ -83,37 +175,12 @@ function loadCrimeData() {
     }
     
     // Clear existing markers
-    markers.forEach(marker => map.removeLayer(marker));
+    markerLayer.clearLayers();
     markers = [];
+    markersById.clear();
     
     // Add markers for each report
-    reports.forEach(report => {
-        if (report.latitude && report.longitude) {
-            const marker = L.circleMarker([report.latitude, report.longitude], {
-                color: getCrimeColor(report.category),
-                fillColor: getCrimeColor(report.category),
-                fillOpacity: 0.8,
-                radius: 8,
-                weight: 2
-            });
-            
-            // Create popup content
-            const popupContent = `
-                <div>
-                    <h6><strong>${report.category || 'Unknown'}</strong></h6>
-                    <p class="mb-1">${report.original_text ? (report.original_text.length > 100 ? report.original_text.substring(0, 100) + '...' : report.original_text) : 'No description'}</p>
-                    <small class="text-muted">
-                        <i class="fas fa-clock"></i> ${new Date(report.timestamp).toLocaleString()}<br>
-                        <i class="fas fa-shield-alt"></i> Trust: ${Math.round(report.trust_score * 100)}%
-                    </small>
-                </div>
-            `;
-            
-            marker.bindPopup(popupContent);
-            marker.addTo(map);
-            markers.push(marker);
-        }
-    });
+    reports.forEach(addReportMarker);
     
     // Fit map to show all markers if any exist
     if (markers.length > 0) {
@@ -124,6 +191,85 @@ function loadCrimeData() {
     console.log(`Loaded ${markers.length} crime markers`);
 }
 
+// Add a single report to the map (ignores reports already shown)
+function addReportMarker(report) {
+    if (!report.latitude || !report.longitude || markersById.has(report.id)) {
+        return null;
+    }
+    
+    const marker = L.circleMarker([report.latitude, report.longitude], {
+        color: getCrimeColor(report.category),
+        fillColor: getCrimeColor(report.category),
+        fillOpacity: 0.8,
+        radius: 8,
+        weight: 2
+    });
+    
+    // Create popup content
+    const popupContent = `
+        <div>
+            <h6><strong>${report.category || 'Unknown'}</strong></h6>
+            <p class="mb-1">${report.original_text ? (report.original_text.length > 100 ? report.original_text.substring(0, 100) + '...' : report.original_text) : 'No description'}</p>
+            <small class="text-muted">
+                <i class="fas fa-clock"></i> ${new Date(report.timestamp).toLocaleString()}<br>
+                <i class="fas fa-shield-alt"></i> Trust: ${Math.round(report.trust_score * 100)}%
+            </small>
+        </div>
+    `;
+    
+    marker.bindPopup(popupContent);
+    marker.addTo(markerLayer);
+    markers.push(marker);
+    markersById.set(report.id, marker);
+    return marker;
+}
+
+// Subscribe to the server-sent events feed of new verified reports
+function initializeLiveFeed() {
+    if (!window.EventSource) {
+        console.log('EventSource not supported - live updates disabled');
+        return;
+    }
+    
+    // EventSource reconnects by itself and resumes with Last-Event-ID
+    liveFeed = new EventSource('/api/stream');
+    
+    liveFeed.addEventListener('report', function(event) {
+        const report = JSON.parse(event.data);
+        if (addReportMarker(report)) {
+            window.crimeData.reports.unshift(report);
+            updateChartCategory(report.category || 'Unknown');
+            scheduleClusterRefresh();
+        }
+    });
+    
+    // Events were missed (slow connection or server restart) - reload the full set
+    liveFeed.addEventListener('resync', function() {
+        console.log('Live feed resync requested');
+        refreshDashboard();
+    });
+    
+    liveFeed.onerror = function() {
+        console.log('Live feed disconnected, retrying...');
+    };
+}
+
+// Count one more report in the statistics chart
+function updateChartCategory(category) {
+    const stats = window.crimeData.statistics;
+    stats[category] = (stats[category] || 0) + 1;
+    
+    if (!statsChart) {
+        initializeChart();
+        return;
+    }
+    
+    statsChart.data.labels = Object.keys(stats);
+    statsChart.data.datasets[0].data = Object.values(stats);
+    statsChart.data.datasets[0].backgroundColor = CHART_COLORS.slice(0, statsChart.data.labels.length);
+    statsChart.update();
+}
+
 // Get color based on crime category
 function getCrimeColor(category) {
     const colors = {
@@ -254,13 +400,18 @@ function submitReport(reportData) {
             document.getElementById('crime-report-form').reset();
             document.getElementById('location-status').innerHTML = '';
             
-            // Show success message
-            showAlert('Report submitted successfully! The page will reload to show updated data.', 'success');
-            
-            // Reload page to show new data
-            setTimeout(() => {
-                window.location.reload();
-            }, 2000);
+            if (liveFeed && liveFeed.readyState === EventSource.OPEN) {
+                // The live feed will add the report to the map
+                showAlert('Report submitted successfully!', 'success');
+            } else {
+                // Show success message
+                showAlert('Report submitted successfully! The page will reload to show updated data.', 'success');
+                
+                // Reload page to show new data
+                setTimeout(() => {
+                    window.location.reload();
+                }, 2000);
+            }
         } else {
             showAlert(data.message || 'Report could not be processed. Please try again.', 'warning');
         }
@@ -306,6 +457,9 @@ function refreshDashboard() {
             if (Array.isArray(data)) {
                 window.crimeData.reports = data;
                 loadCrimeData();
+                if (map.hasLayer(clusterLayer)) {
+                    loadClusters();
+                }
                 console.log('Dashboard data refreshed');
             }
         })
@@ -0,0 +1,93 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from extensions import db
+from models import CrimeReport, CategoryStat
+from counters import increment_counts
+from persistence import VERIFIED_THRESHOLD, register_transaction_hook
+
+BUCKETS = ("hour", "day")
+# bucket_start of the single all-time row per category
+ALL_TIME = datetime(1970, 1, 1)
+# Windows longer than this are summed from day buckets instead of hour buckets
+HOURLY_WINDOW_LIMIT = timedelta(days=7)
+
+def bucket_start(timestamp, bucket):
+    """Truncate a timestamp to the start of its hour/day bucket"""
+    if bucket == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "all":
+        return ALL_TIME
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+def _increments(reports):
+    """Counter increments for an iterable of (category, timestamp, trust_score, canonical_id)"""
+    counts = Counter()
+    for category, timestamp, trust_score, canonical_id in reports:
+        # Duplicates are left out, as on the map and in the live feed
+        if trust_score is None or trust_score <= VERIFIED_THRESHOLD or canonical_id is not None:
+            continue
+        category = category or "Unknown"
+        counts[("all", ALL_TIME, category)] += 1
+        for bucket in BUCKETS:
+            counts[(bucket, bucket_start(timestamp, bucket), category)] += 1
+    return {key: {"count": n} for key, n in counts.items()}
+
+@register_transaction_hook
+def record_reports(rows):
+    """Update the counters for newly inserted report rows (same transaction)"""
+    increment_counts(
+        CategoryStat, ("bucket", "bucket_start", "category"),
+        _increments((row["category"], row["timestamp"], row["trust_score"], row.get("canonical_id")) for row in rows)
+    )
+
+def category_totals(since=None, until=None):
+    """Verified report counts per category, optionally within [since, until).
+
+    Windows are aligned to whole hours (or days for long windows).
+    """
+    if since is None and until is None:
+        query = db.session.query(CategoryStat.category, CategoryStat.count).filter(
+            CategoryStat.bucket == "all"
+        )
+        return {category: count for category, count in query if count}
+
+    bucket = "hour" if since and (until or datetime.utcnow()) - since <= HOURLY_WINDOW_LIMIT else "day"
+    query = db.session.query(CategoryStat.category, func.sum(CategoryStat.count)).filter(
+        CategoryStat.bucket == bucket
+    )
+    if since is not None:
+        query = query.filter(CategoryStat.bucket_start >= bucket_start(since, bucket))
+    if until is not None:
+        query = query.filter(CategoryStat.bucket_start < until)
+    return {category: int(count) for category, count in query.group_by(CategoryStat.category) if count}
+
+def category_series(bucket, since, until=None):
+    """Per-bucket counts: [{'bucket_start': ..., 'counts': {category: n}}, ...]"""
+    query = db.session.query(CategoryStat.bucket_start, CategoryStat.category, CategoryStat.count).filter(
+        CategoryStat.bucket == bucket,
+        CategoryStat.bucket_start >= bucket_start(since, bucket)
+    )
+    if until is not None:
+        query = query.filter(CategoryStat.bucket_start < until)
+
+    series = {}
+    for start, category, count in query.order_by(CategoryStat.bucket_start):
+        series.setdefault(start, {})[category] = count
+    return [{"bucket_start": start.isoformat(), "counts": counts} for start, counts in series.items()]
+
+def rebuild_stats(batch_size=5000):
+    """Recompute every counter from the crime_reports table"""
+    db.session.query(CategoryStat).delete()
+    rows = db.session.query(
+        CrimeReport.category, CrimeReport.timestamp, CrimeReport.trust_score, CrimeReport.canonical_id
+    ).filter(
+        CrimeReport.trust_score > VERIFIED_THRESHOLD,
+        CrimeReport.canonical_id.is_(None)
+    ).yield_per(batch_size)
+    increments = _increments(rows)
+    increment_counts(CategoryStat, ("bucket", "bucket_start", "category"), increments)
+    db.session.commit()
+    return sum(amounts["count"] for (bucket, _, _), amounts in increments.items() if bucket == "all")
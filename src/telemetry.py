@@ -0,0 +1,327 @@
+"""Timing spans, per-request traces and Prometheus-style metrics.
+
+Spans time a block of work into a latency histogram and, inside a request,
+into that request's trace. Metrics are rendered in the Prometheus text
+exposition format by /metrics. With TELEMETRY_ENABLED=0 spans are a shared
+no-op, node wrappers return the node unchanged and nothing is recorded.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+import uuid
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+TRUST_SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not TELEMETRY_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge:
+    """Value that can go up and down, optionally split by labels"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        if not TELEMETRY_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not TELEMETRY_ENABLED:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            yield f"{self.name}_bucket{labels} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(float(series[-2]))}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.setdefault(metric.name, metric)
+            return self._metrics[metric.name]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            exposed = f"{metric.name}_total" if metric.kind == "counter" else metric.name
+            lines.append(f"# HELP {exposed} {metric.help}")
+            lines.append(f"# TYPE {exposed} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name, help_text, labelnames=()):
+    return registry.register(Counter(name, help_text, labelnames))
+
+def gauge(name, help_text, labelnames=()):
+    return registry.register(Gauge(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return registry.register(Histogram(name, help_text, labelnames, buckets))
+
+# Metrics shared across modules
+http_request_seconds = histogram("crime_http_request_duration_seconds", "HTTP request latency",
+                                 ("endpoint", "method", "status"))
+span_seconds = histogram("crime_span_duration_seconds", "Latency of instrumented operations", ("span",))
+node_seconds = histogram("crime_pipeline_node_duration_seconds", "LangGraph node latency", ("node",))
+node_errors = counter("crime_pipeline_node_errors", "LangGraph node exceptions", ("node",))
+db_query_seconds = histogram("crime_db_query_duration_seconds", "Database statement latency", ("operation",))
+geocode_requests = counter("crime_geocode_requests", "Geocoder lookups by outcome", ("outcome",))
+geocode_seconds = histogram("crime_geocode_duration_seconds", "Remote geocoder call latency")
+geocoder_breaker_state = gauge("crime_geocoder_breaker_state",
+                               "Geocoder circuit breaker state (0 closed, 1 half-open, 2 open)", ("provider",))
+geocoder_breaker_transitions = counter("crime_geocoder_breaker_transitions",
+                                       "Geocoder circuit breaker state changes", ("provider", "state"))
+inference_batch_size = histogram("crime_inference_batch_size", "Texts per model forward pass",
+                                 buckets=BATCH_SIZE_BUCKETS)
+admission_rejections = counter("crime_admission_rejections", "Requests turned away by admission control",
+                               ("reason",))
+pipeline_in_flight = gauge("crime_pipeline_in_flight", "Pipeline executions currently running")
+trust_scores = histogram("crime_report_trust_score", "Trust score of processed reports",
+                         buckets=TRUST_SCORE_BUCKETS)
+
+# ---- traces ----
+
+_current_trace = contextvars.ContextVar("crime_trace", default=None)
+
+# Client-supplied X-Trace-Id values are echoed back only if they look like an id
+TRACE_ID_PATTERN = re.compile(r"[0-9a-f-]{1,64}")
+# Distinct span names in a Server-Timing header; repeats are summed into one entry
+SERVER_TIMING_MAX_ENTRIES = 20
+
+class Trace:
+    """Spans recorded while handling one request"""
+    __slots__ = ("trace_id", "spans", "started")
+
+    def __init__(self, trace_id=None):
+        if not trace_id or not TRACE_ID_PATTERN.fullmatch(trace_id):
+            trace_id = uuid.uuid4().hex
+        self.trace_id = trace_id
+        self.spans = []  # (name, seconds)
+        self.started = time.perf_counter()
+
+    def server_timing(self):
+        """Spans as a Server-Timing header value: total ms per span name, with the count when repeated"""
+        totals = {}
+        for name, seconds in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, count + 1)
+        entries = []
+        for name, (total, count) in list(totals.items())[:SERVER_TIMING_MAX_ENTRIES]:
+            entry = f"{name};dur={total * 1000:.1f}"
+            entries.append(f'{entry};desc="x{count}"' if count > 1 else entry)
+        return ", ".join(entries)
+
+def start_trace(trace_id=None):
+    """Begin a trace for the current request; returns (trace, token for end_trace)"""
+    trace = Trace(trace_id)
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+def current_trace():
+    return _current_trace.get()
+
+class _Span:
+    __slots__ = ("name", "histogram", "labels", "started")
+
+    def __init__(self, name, histogram, labels):
+        self.name = name
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.histogram.observe(elapsed, **self.labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, elapsed))
+        return False
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name, histogram=None, **labels):
+    """Time a block into `histogram` (default: crime_span_duration_seconds{span=name})"""
+    if not TELEMETRY_ENABLED:
+        return _NOOP_SPAN
+    if histogram is None:
+        histogram, labels = span_seconds, {"span": name}
+    return _Span(name, histogram, labels)
+
+def instrument_node(name, node):
+    """Wrap a sync or async LangGraph node with a timing span"""
+    if not TELEMETRY_ENABLED:
+        return node
+
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state):
+            try:
+                with span(name, node_seconds, node=name):
+                    return await node(state)
+            except Exception:
+                node_errors.inc(node=name)
+                raise
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state):
+        try:
+            with span(name, node_seconds, node=name):
+                return node(state)
+        except Exception:
+            node_errors.inc(node=name)
+            raise
+    return wrapper
+
+def instrument_database():
+    """Time every SQL statement on every engine (no-op when disabled)"""
+    if not TELEMETRY_ENABLED:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("telemetry_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("telemetry_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_query_seconds.observe(elapsed, operation=operation)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append((f"db_{operation.lower()}", elapsed))
+
+def _handle_error(context):
+    """A failed statement never reaches after_cursor_execute; drop its start time"""
+    started = context.connection.info.get("telemetry_started") if context.connection is not None else None
+    if started:
+        started.pop()
@@ -0,0 +1,38 @@
+"""Shared setup: a throwaway SQLite database, the stub model and no network."""
+import os
+import sys
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="crime-alert-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}",
+    "MODEL_BACKEND": "stub",
+    "MODEL_LOAD_MODE": "lazy",
+    "MAPBOX_TOKEN": "",
+    "GEOCODE_CACHE_PATH": "",
+    "CLASSIFICATION_CACHE_PATH": "",
+    "RATE_LIMIT_DB_PATH": "",
+    "RATE_LIMIT_PER_MINUTE": "0",
+    "DASHBOARD_CACHE_ENABLED": "0",
+    "WRITE_BEHIND": "0",
+    "TELEMETRY_ENABLED": "1",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def app():
+    """The Flask app in an app context, with every table emptied"""
+    from app import app as flask_app
+    from extensions import db
+    with flask_app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        yield flask_app
+        db.session.rollback()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from admission import ConcurrencyGate, MemoryBucketStore, Overloaded, RateLimited, RateLimiter, client_key
+
+def test_rate_limiter_allows_burst_then_limits():
+    limiter = RateLimiter(per_minute=60, burst=3, store=MemoryBucketStore())
+    for _ in range(3):
+        limiter.check("ip:1")
+    with pytest.raises(RateLimited) as rejected:
+        limiter.check("ip:1")
+    assert rejected.value.retry_after >= 1
+    # Buckets are per client
+    limiter.check("ip:2")
+
+def test_rate_limiter_charges_cost():
+    limiter = RateLimiter(per_minute=60, burst=10, store=MemoryBucketStore())
+    limiter.check("ip:1", cost=10)
+    with pytest.raises(RateLimited):
+        limiter.check("ip:1")
+
+def test_client_key_prefers_known_api_keys(monkeypatch):
+    monkeypatch.setattr("admission.API_KEYS", {"secret"})
+    assert client_key("secret", "10.0.0.1").startswith("key:")
+    assert client_key("unknown", "10.0.0.1") == "ip:10.0.0.1"
+
+def test_gate_sheds_when_the_queue_is_over_budget():
+    gate = ConcurrencyGate(limit=1, budget=0.05)
+    with gate.admit():
+        with pytest.raises(Overloaded):
+            with gate.admit():
+                pass
+    assert gate.metrics()["active"] == 0
+
+def test_admit_async_never_waits_on_the_event_loop(monkeypatch):
+    gate = ConcurrencyGate(limit=1, budget=5)
+    waits = []
+    acquire = gate._acquire
+    def recording_acquire():
+        waits.append(threading.current_thread() is threading.main_thread())
+        return acquire()
+    monkeypatch.setattr(gate, "_acquire", recording_acquire)
+
+    async def run():
+        # Free slot: taken without any blocking call
+        async with gate.admit_async():
+            assert gate.metrics()["active"] == 1
+        assert waits == []
+        # Busy gate: the wait happens in a worker thread while the loop keeps running
+        held = gate._try_acquire()
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        ticking = asyncio.create_task(ticker())
+        threading.Timer(0.2, gate._release, (held,)).start()
+        async with gate.admit_async():
+            pass
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 5
+    assert waits == [False]
+    assert gate.metrics()["active"] == 0
+
+def test_cancelled_admit_async_releases_its_slot():
+    gate = ConcurrencyGate(limit=1, budget=5)
+
+    async def run():
+        held = gate._try_acquire()
+        async def waiter():
+            async with gate.admit_async():
+                pass
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.05)  # now queued in a worker thread
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        gate._release(held)
+        # The worker thread still wins the slot, and gives it straight back
+        for _ in range(100):
+            if gate.metrics()["active"] == 0 and gate.metrics()["admitted"] == 2:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    metrics = gate.metrics()
+    assert metrics["admitted"] == 2
+    assert metrics["active"] == 0
+    # The slot is usable again
+    with gate.admit():
+        pass
+
+def test_batch_reports_draw_on_the_batch_quota(client, monkeypatch):
+    monkeypatch.setattr("app.rate_limiter", RateLimiter(per_minute=60, burst=20, store=MemoryBucketStore()))
+    monkeypatch.setattr("app.batch_rate_limiter", RateLimiter(per_minute=60, burst=30, store=MemoryBucketStore()))
+    reports = [{"report": f"Car broken into on Main Street, report {i}"} for i in range(35)]
+    response = client.post("/api/process/batch", json=reports)
+    outcomes = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    limited = sorted(outcome["index"] for outcome in outcomes if "retry_after" in outcome)
+    # Well past RATE_LIMIT_BURST; only the reports beyond the batch burst are turned away
+    assert len(outcomes) == 35
+    assert limited == list(range(30, 35))
@@ -0,0 +1,25 @@
+import pytest
+from geocoding import HALF_OPEN, CircuitBreaker, GeocoderRejected, GeocodingClient
+
+def test_open_breaker_rejects_without_waiting_for_a_slot():
+    breaker = CircuitBreaker("test", min_calls=1, cooldown=60)
+    breaker.record_failure()
+    client = GeocodingClient(lambda text: (1.0, 2.0), max_concurrency=1, queue_timeout=5, breaker=breaker)
+    client._slots.acquire()  # every slot busy: a wait would take queue_timeout
+    with pytest.raises(GeocoderRejected, match="circuit breaker"):
+        client._call("Ikeja")
+    assert client.counters["rejected_open"] == 1
+    assert client.counters["rejected_busy"] == 0
+
+def test_busy_rejection_gives_back_the_half_open_trial():
+    breaker = CircuitBreaker("test", min_calls=1, cooldown=0)
+    breaker.record_failure()
+    client = GeocodingClient(lambda text: (1.0, 2.0), max_concurrency=1, queue_timeout=0.01, breaker=breaker)
+    client._slots.acquire()
+    with pytest.raises(GeocoderRejected, match="concurrent"):
+        client._call("Ikeja")
+    assert breaker.state == HALF_OPEN
+    client._slots.release()
+    # The trial is still available and closes the breaker
+    assert client._call("Ikeja") == (1.0, 2.0)
+    assert breaker.state != HALF_OPEN
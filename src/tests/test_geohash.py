@@ -0,0 +1,63 @@
+import random
+import pytest
+import geohash
+from extensions import db
+from models import CrimeReport
+from persistence import build_report_row, save_reports
+from spatial import filter_bbox, filter_near, within_radius
+
+def test_encode_known_value():
+    assert geohash.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash.encode(42.6, -5.6, 5) == "ezs42"
+
+def test_decode_returns_the_cell_containing_the_point():
+    for latitude, longitude in [(6.5244, 3.3792), (-33.8688, 151.2093), (89.9, -179.9), (0.0, 0.0)]:
+        cell = geohash.encode(latitude, longitude)
+        min_lat, min_lng, max_lat, max_lng = geohash.decode_bbox(cell)
+        assert min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng
+        lat_step, lng_step = geohash.cell_size(len(cell))
+        assert max_lat - min_lat == pytest.approx(lat_step)
+        assert max_lng - min_lng == pytest.approx(lng_step)
+        assert geohash.encode(*geohash.decode(cell), len(cell)) == cell
+
+def test_prefix_range_holds_every_longer_hash():
+    lo, hi = geohash.prefix_range("s0")
+    assert lo <= geohash.encode(4.3, 1.5) < hi
+    assert not lo <= geohash.encode(6.5, 3.4) < hi
+    assert lo <= "s0" + geohash.BASE32[-1] * 6 < hi
+
+def test_cover_bbox_covers_the_box_within_max_cells():
+    box = (6.40, 3.30, 6.70, 3.55)
+    cells = geohash.cover_bbox(*box, max_cells=32)
+    assert 0 < len(cells) <= 32
+    rng = random.Random(5)
+    for _ in range(200):
+        point = geohash.encode(rng.uniform(box[0], box[2]), rng.uniform(box[1], box[3]))
+        assert any(point.startswith(cell) for cell in cells)
+
+def test_haversine_and_radius_bbox():
+    # One degree of latitude
+    assert geohash.haversine_km(0, 0, 1, 0) == pytest.approx(111.195, abs=0.01)
+    min_lat, min_lng, max_lat, max_lng = geohash.radius_bbox(6.5, 3.4, 10)
+    for latitude, longitude in [(min_lat, 3.4), (max_lat, 3.4), (6.5, min_lng), (6.5, max_lng)]:
+        assert geohash.haversine_km(6.5, 3.4, latitude, longitude) == pytest.approx(10, rel=1e-3)
+
+def test_spatial_filters_match_a_full_scan(app):
+    rng = random.Random(7)
+    rows = [build_report_row(f"Burglary report {i} on Allen Avenue",
+                             {"gps_location": (rng.uniform(6.3, 6.8), rng.uniform(3.2, 3.7)),
+                              "trust_score": 0.9, "alert_type": "burglary"}) for i in range(300)]
+    save_reports(rows)
+    everything = db.session.query(CrimeReport).all()
+    assert all(r.geohash for r in everything)
+
+    box = (6.45, 3.30, 6.60, 3.50)
+    expected = {r.id for r in everything if box[0] <= r.latitude <= box[2] and box[1] <= r.longitude <= box[3]}
+    assert expected
+    assert {r.id for r in filter_bbox(db.session.query(CrimeReport), *box)} == expected
+
+    near = (6.5, 3.4, 8.0)
+    check = within_radius(*near)
+    expected = {r.id for r in everything if check(r)}
+    assert expected
+    assert {r.id for r in filter_near(db.session.query(CrimeReport), *near) if check(r)} == expected
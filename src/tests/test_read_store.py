@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import json
+from sqlalchemy import insert
+from extensions import db
+from models import CrimeReport
+from persistence import build_report_row, save_reports
+from read_store import ReportStore, htmlsafe_json
+
+def report_rows(count, start=datetime(2026, 1, 1)):
+    rows = []
+    for i in range(count):
+        # Distinct texts, so none is linked as a duplicate of another; markup exercises the escaping
+        row = build_report_row(f"Armed robbery <b>number {i}</b> near the market & gate at {start:%H:%M on %d %B}",
+                               {"gps_location": (6.5 + i * 0.001, 3.4), "trust_score": 0.9, "alert_type": "robbery"})
+        row["timestamp"] = start + timedelta(minutes=i)
+        rows.append(row)
+    return rows
+
+def insert_without_hooks(rows):
+    """Commit rows like save_reports, but leave the commit hooks to the caller"""
+    ids = db.session.scalars(insert(CrimeReport).returning(CrimeReport.id, sort_by_parameter_order=True), rows).all()
+    db.session.commit()
+    return [dict(row, id=report_id) for row, report_id in zip(rows, ids)]
+
+def page_ids(store, limit=100):
+    body, _ = store.page(limit)
+    return [report["id"] for report in json.loads(body)]
+
+def test_record_after_sync_does_not_duplicate(app):
+    store = ReportStore(size=100)
+    store.load()
+    store.record(insert_without_hooks(report_rows(1)))
+    # Committed, but its commit hook has not run yet when another request syncs
+    saved = insert_without_hooks(report_rows(1, start=datetime(2026, 1, 2)))
+    store.sync(saved[0]["id"])
+    store.record(saved)
+    assert page_ids(store) == [2, 1]
+
+def test_record_after_load_does_not_duplicate(app):
+    saved = insert_without_hooks(report_rows(3))
+    store = ReportStore(size=100)
+    store.load()
+    store.record(saved)
+    assert page_ids(store) == [3, 2, 1]
+
+def test_record_before_load_is_ignored(app):
+    store = ReportStore(size=100)
+    store.record(insert_without_hooks(report_rows(2)))
+    assert store.count == 0
+    store.load()
+    assert page_ids(store) == [2, 1]
+
+def test_out_of_order_insert_and_eviction(app):
+    store = ReportStore(size=8)
+    store.load()
+    rows = report_rows(20)
+    # Ids no longer follow timestamps, and 20 rows overflow the capacity of 16
+    saved = insert_without_hooks(rows[10:] + rows[:10])
+    store.record(saved)
+    assert store.counters["evicted"] > 0
+    body, last = store.page(3)
+    assert [report["timestamp"] for report in json.loads(body)] == [
+        (datetime(2026, 1, 1) + timedelta(minutes=i)).isoformat() for i in (19, 18, 17)]
+    assert last is not None
+    # Pages that reach past the oldest kept report go to the database
+    assert store.page(50) is None
+
+def test_page_matches_the_database_path(client):
+    save_reports(report_rows(30))
+    from read_store import report_store
+    report_store.load()
+    stored = client.get("/api/reports?limit=10")
+    report_store.enabled = False
+    try:
+        fallback = client.get("/api/reports?limit=10")
+    finally:
+        report_store.enabled = True
+    assert stored.data == fallback.data
+    assert stored.headers["ETag"] == fallback.headers["ETag"]
+    assert stored.headers["X-Next-Cursor"] == fallback.headers["X-Next-Cursor"]
+    # Duplicates always come from the database, with the same encoding
+    with_duplicates = client.get("/api/reports?limit=10&include_duplicates=1")
+    assert with_duplicates.data == stored.data
+
+def test_htmlsafe_json_escapes_markup():
+    assert htmlsafe_json({"text": "</script>&'"}) == '{"text":"\\u003c/script\\u003e\\u0026\\u0027"}'
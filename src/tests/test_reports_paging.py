@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+import pytest
+from app import decode_cursor, encode_cursor
+from persistence import build_report_row, save_reports
+from read_store import report_store
+
+def save_verified(count, street):
+    rows = []
+    for i in range(count):
+        # Distinct texts per test, or the deduplicator links them to an earlier test's reports
+        row = build_report_row(f"Phone snatched at bus stop {i} on {street}",
+                               {"gps_location": (6.5 + i * 0.001, 3.4), "trust_score": 0.9, "alert_type": "theft"})
+        # Pairs of reports share a timestamp, so paging has to break ties by id
+        row["timestamp"] = datetime(2026, 3, 1) + timedelta(minutes=i // 2)
+        rows.append(row)
+    return save_reports(rows)
+
+def walk_pages(client, limit, **params):
+    ids, url = [], "/api/reports"
+    params = dict(params, limit=limit)
+    while True:
+        response = client.get(url, query_string=params)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= limit
+        ids.extend(report["id"] for report in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+        params["cursor"] = cursor
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(timestamp, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_invalid_cursor_is_rejected(client, cursor):
+    assert client.get("/api/reports", query_string={"cursor": cursor}).status_code == 400
+
+@pytest.mark.parametrize("use_store", [True, False])
+def test_pages_visit_every_report_once_newest_first(client, monkeypatch, use_store):
+    monkeypatch.setattr(report_store, "enabled", use_store)
+    monkeypatch.setattr(report_store, "ready", False)
+    ids = save_verified(23, "Ikorodu Road" if use_store else "Herbert Macaulay Way")
+    # Newest first: later timestamp, then higher id among equal timestamps
+    expected = sorted(ids, key=lambda report_id: ((report_id - ids[0]) // 2, report_id), reverse=True)
+    assert walk_pages(client, limit=5) == expected
+    assert walk_pages(client, limit=50) == expected
@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import create_engine, text
+import telemetry
+
+def test_failed_statements_do_not_leak_start_times():
+    telemetry.instrument_database()
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["telemetry_started"] == []
+
+def test_trace_ids_are_validated():
+    assert telemetry.Trace("0af7651916cd43dd-8448eb211c80319c").trace_id == "0af7651916cd43dd-8448eb211c80319c"
+    for bad in ("<script>", "a\r\nSet-Cookie: x=1", "f" * 65, ""):
+        trace_id = telemetry.Trace(bad).trace_id
+        assert trace_id != bad and telemetry.TRACE_ID_PATTERN.fullmatch(trace_id)
+
+def test_server_timing_sums_repeated_spans():
+    trace = telemetry.Trace()
+    trace.spans = [("classify", 0.002)] + [("db_select", 0.001)] * 500
+    assert trace.server_timing() == 'classify;dur=2.0, db_select;dur=500.0;desc="x500"'
+    trace.spans = [(f"span_{i}", 0.001) for i in range(100)]
+    assert trace.server_timing().count(";dur=") == telemetry.SERVER_TIMING_MAX_ENTRIES
+
+def test_invalid_trace_header_gets_a_fresh_id(client):
+    response = client.get("/api/stats", headers={"X-Trace-Id": "not a trace id!"})
+    assert telemetry.TRACE_ID_PATTERN.fullmatch(response.headers["X-Trace-Id"])
+    response = client.get("/api/stats", headers={"X-Trace-Id": "abc-123"})
+    assert response.headers["X-Trace-Id"] == "abc-123"
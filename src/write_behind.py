@@ -0,0 +1,162 @@
+"""Write-behind persistence for accepted reports.
+
+Request threads hand finished rows to a bounded queue and return at once with
+a provisional id. A single writer thread group-commits the queue every
+WRITE_BEHIND_BATCH_ROWS rows or WRITE_BEHIND_FLUSH_MS milliseconds, so SQLite
+sees one writer and one transaction per group instead of one per request.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from persistence import save_reports
+
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_BATCH_ROWS = int(os.getenv("WRITE_BEHIND_BATCH_ROWS", "100"))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+# How many provisional ids are remembered for status lookups
+WRITE_BEHIND_STATUS_SIZE = int(os.getenv("WRITE_BEHIND_STATUS_SIZE", "50000"))
+
+_STOP = object()
+
+class ReportWriter:
+    """Single background writer that group-commits queued report rows"""
+
+    def __init__(self, app, max_queue=WRITE_BEHIND_QUEUE_SIZE, batch_rows=WRITE_BEHIND_BATCH_ROWS,
+                 flush_ms=WRITE_BEHIND_FLUSH_MS):
+        self.app = app
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._status = OrderedDict()
+        self._status_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.counters = {"queued": 0, "saved": 0, "failed": 0, "commits": 0}
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for saving and return its provisional id.
+
+        Raises queue.Full when the writer is saturated (or closed) so the caller
+        can fall back to a synchronous save.
+        """
+        if self._closed:
+            raise queue.Full("writer is closed")
+        self.start()
+        provisional_id = uuid.uuid4().hex
+        self._set_status(provisional_id, {"status": "queued"})
+        try:
+            self._queue.put_nowait((provisional_id, row))
+        except queue.Full:
+            self._forget(provisional_id)
+            raise
+        self.counters["queued"] += 1
+        return provisional_id
+
+    def status(self, provisional_id):
+        """{'status': 'queued'|'saved'|'failed', 'report_id': ...} or None if unknown"""
+        with self._status_lock:
+            status = self._status.get(provisional_id)
+            return dict(status) if status else None
+
+    def _set_status(self, provisional_id, status):
+        with self._status_lock:
+            self._status[provisional_id] = status
+            self._status.move_to_end(provisional_id)
+            while len(self._status) > WRITE_BEHIND_STATUS_SIZE:
+                self._status.popitem(last=False)
+
+    def _forget(self, provisional_id):
+        with self._status_lock:
+            self._status.pop(provisional_id, None)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_rows and first is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item in batch if item is not _STOP]
+            if items:
+                self._write(items)
+            for _ in batch:
+                self._queue.task_done()
+            if len(items) != len(batch):
+                return
+
+    def _write(self, items):
+        with self.app.app_context():
+            try:
+                report_ids = save_reports([row for _, row in items])
+                self.counters["commits"] += 1
+            except Exception as e:
+                self.app.logger.error(f"Group commit of {len(items)} reports failed, retrying one by one: {str(e)}")
+                report_ids = []
+                for _, row in items:
+                    try:
+                        report_ids.extend(save_reports([row]))
+                        self.counters["commits"] += 1
+                    except Exception as row_error:
+                        self.app.logger.error(f"Error saving queued report: {str(row_error)}")
+                        report_ids.append(None)
+
+        for (provisional_id, _), report_id in zip(items, report_ids):
+            if report_id is None:
+                self.counters["failed"] += 1
+                self._set_status(provisional_id, {"status": "failed"})
+            else:
+                self.counters["saved"] += 1
+                self._set_status(provisional_id, {"status": "saved", "report_id": report_id})
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been committed"""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=30.0):
+        """Stop accepting reports and flush the queue (registered with atexit)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def metrics(self):
+        return dict(self.counters, queue_depth=self._queue.qsize())
+
+def create_writer(app):
+    """Create the writer and make sure it drains on interpreter shutdown"""
+    writer = ReportWriter(app)
+    atexit.register(writer.close)
+    return writer